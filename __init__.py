@@ -1,7 +1,32 @@
 import bpy
 from bpy.types import AddonPreferences, PropertyGroup, Operator, Panel
-from bpy.props import BoolProperty, IntProperty, EnumProperty, StringProperty, PointerProperty, FloatVectorProperty
+from bpy.props import BoolProperty, IntProperty, EnumProperty, StringProperty, PointerProperty, FloatVectorProperty, CollectionProperty
+from mathutils import Vector
 import os
+import sys
+import argparse
+import json
+import ast
+import re
+import csv
+import array
+import gc
+import hashlib
+import shutil
+import socket
+import struct
+import subprocess
+import tempfile
+import threading
+import time
+import gzip
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import zstandard  # Optional, only needed for Zstandard compression
+except ImportError:
+    zstandard = None
 
 bl_info = {
     "name": "Super Batch Export",
@@ -22,9 +47,40 @@ bl_info = {
 # Also useful for the get_preset_index function.
 preset_enum_items_refs = {}
 
+# A Dictionary of operator_name: {preset name: index in its preset EnumProperty items},
+# so get_preset_index doesn't need to search the list.
+preset_index_refs = {}
+
+# A Dictionary of operator_name: modification times of its preset directories when its
+# presets were last listed. The panels ask for the presets every time they're drawn,
+# so the directories are only listed again when one of them changed.
+preset_dir_mtimes = {}
+
+# Blender's script paths, which only change when the preferences change
+# (cleared by the refresh presets button)
+script_paths_cache = []
+
+# Returns the modification time of each directory an operator's presets can be in
+# (None for the ones that don't exist). Creating, deleting or renaming a preset
+# changes the modification time of its directory.
+def get_preset_dir_mtimes(operator):
+    if not script_paths_cache:
+        script_paths_cache.extend(bpy.utils.script_paths())
+    mtimes = []
+    for path in script_paths_cache:
+        try:
+            mtimes.append(os.stat(os.path.join(path, "presets", "operator", operator)).st_mtime_ns)
+        except OSError:
+            mtimes.append(None)
+    return mtimes
+
 # Returns a list of tuples used for an EnumProperty's items (identifier, name, description)
 # identifier, and name are the file name of the preset without the file extension (.py)
 def get_operator_presets(operator):
+    mtimes = get_preset_dir_mtimes(operator)
+    if operator in preset_enum_items_refs and preset_dir_mtimes.get(operator) == mtimes:
+        return preset_enum_items_refs[operator]
+
     presets = [('NO_PRESET', "(no preset)", "", 0)]
     for d in bpy.utils.script_paths(subdir="presets/operator/" + operator):
         for f in os.listdir(d):
@@ -35,45 +91,1081 @@ def get_operator_presets(operator):
     # Blender's doc warns that not keeping reference to enum props array can
     # cause crashs and weird issues:
     preset_enum_items_refs[operator] = presets
+    indices = {}
+    for p in range(len(presets)):
+        indices.setdefault(presets[p][0], p)  # The first preset with a name is the one used
+    preset_index_refs[operator] = indices
+    preset_dir_mtimes[operator] = mtimes
     return presets
 
+# Forgets all the cached presets, so they're found again next time they're needed
+def clear_preset_caches():
+    preset_dir_mtimes.clear()
+    script_paths_cache.clear()
+    preset_options_cache.clear()
+
+# A Dictionary of (operator_name, preset_name): (file path, file mtime, options).
+# Loading a preset means scanning every script path and parsing the file,
+# so the result is kept here and reused (across items and runs) until the preset file changes on disk.
+preset_options_cache = {}
+
+# Returns the path to an operator's preset file, or None if it can't be found
+def find_operator_preset(operator, preset):
+    for d in bpy.utils.script_paths(subdir="presets/operator/" + operator):
+        fp = "".join([d, "/", preset, ".py"])
+        if os.path.isfile(fp):  # Found the preset file
+            return fp
+    return None
+
 # Returns a dictionary of options from an operator's preset.
 # When calling an operator's method, you can use ** before a dictionary
 # in the method's arguments to set the arguments from that dictionary's
 # key: value pairs. Example:
 # bpy.ops.category.operator(**options)
+# The returned dictionary is a copy, so it's safe to add to it.
 def load_operator_preset(operator, preset):
     options = {}
     if preset == 'NO_PRESET':
         return options
 
-    for d in bpy.utils.script_paths(subdir="presets/operator/" + operator):
-        fp = "".join([d, "/", preset, ".py"])
-        if os.path.isfile(fp):  # Found the preset file
-            print("Using preset " + fp)
-            file = open(fp, 'r')
-            for line in file.readlines():
-                # This assumes formatting of these files remains exactly the same
-                if line.startswith("op."):
-                    line = line.removeprefix("op.")
-                    split = line.split(" = ")
-                    key = split[0]
-                    value = split[1]
-                    options[key] = eval(value)
-            file.close()
-            return options
-    # If it didn't find the preset, use empty options
-    # (the preset option should look blank if the file doesn't exist anyway)
+    key = (operator, preset)
+    cached = preset_options_cache.get(key)
+    fp = cached[0] if cached else None
+    # Only search the script paths again if the cached file went missing
+    if not fp or not os.path.isfile(fp):
+        fp = find_operator_preset(operator, preset)
+    if not fp:
+        # If it didn't find the preset, use empty options
+        # (the preset option should look blank if the file doesn't exist anyway)
+        preset_options_cache.pop(key, None)
+        return options
+
+    mtime = os.path.getmtime(fp)
+    if cached and cached[0] == fp and cached[1] == mtime:
+        return dict(cached[2])
+
+    print("Using preset " + fp)
+    try:
+        options = parse_operator_preset(fp, operator)
+    except (OSError, SyntaxError, ValueError) as e:
+        print("Couldn't read preset " + fp + ": " + str(e))
+    preset_options_cache[key] = (fp, mtime, options)
+    return dict(options)
+
+# Returns the names of an operator's properties, or None if the operator doesn't exist
+def get_operator_properties(operator):
+    category, name = operator.split(".")
+    try:
+        rna_type = getattr(getattr(bpy.ops, category), name).get_rna_type()
+    except (AttributeError, KeyError):
+        return None
+    return set(rna_type.properties.keys())
+
+# Returns a dictionary of options read from an operator preset file, without running it.
+# Presets are Python files setting the operator's properties, like:
+#   op.use_selection = True
+# so the file's syntax tree is read, and only the literal values (numbers, strings,
+# tuples, sets, etc., which can span more than one line) assigned to op are used.
+# Options the operator doesn't have are left out (calling the operator with them would
+# fail), and any line that isn't a literal is skipped, both with a warning in the console.
+def parse_operator_preset(fp, operator):
+    with open(fp, 'r') as file:
+        tree = ast.parse(file.read(), fp)
+
+    options = {}
+    for node in tree.body:
+        if not isinstance(node, ast.Assign) or len(node.targets) != 1:
+            continue
+        target = node.targets[0]
+        if not (isinstance(target, ast.Attribute) and isinstance(target.value, ast.Name)
+                and target.value.id == "op"):
+            continue
+        try:
+            options[target.attr] = ast.literal_eval(node.value)
+        except ValueError:
+            print("Skipping preset option " + target.attr + " (line " +
+                  str(node.lineno) + "), its value isn't a literal")
+
+    properties = get_operator_properties(operator)
+    if properties is not None:
+        unknown = [key for key in options if key not in properties]
+        for key in unknown:
+            del options[key]
+        if unknown:
+            print("Skipping preset options " + operator + " doesn't have: " + ", ".join(unknown))
     return options
 
 # Finds the index of a preset with preset_name and returns it
 # Useful for transferring the value of a saved preset (in a StringProperty)
 # to the NOT saved EnumProperty for that preset used to present a nice GUI.
 def get_preset_index(operator, preset_name):
-    for p in range(len(preset_enum_items_refs[operator])):
-        if preset_enum_items_refs[operator][p][0] == preset_name:
-            return p
-    return 0
+    if operator not in preset_index_refs:
+        get_operator_presets(operator)
+    return preset_index_refs[operator].get(preset_name, 0)
+
+# Describes how to export one file format: which operator to call and with
+# which arguments, the file extension, and how to draw its settings.
+# The formats are kept in export_formats, other addons can add their own
+# formats with register_export_format.
+#   identifier, name, description: used for the Format EnumProperty item
+#   number: the Format EnumProperty item's number, which is saved in .blend files, so
+#       it should never change (other addons should use a number of 100 or higher)
+#   operator: the operator's idname, for example 'export_scene.fbx'
+#   extension: the file extension, or a function(settings, options) returning it
+#   selection: (argument, value) telling the operator to only export selected objects
+#   modifiers: the operator's argument for applying modifiers, if it has one
+#   preset: the BatchExportSettings StringProperty with the chosen preset, if it uses presets
+#       (its EnumProperty must be named the same with _enum after it)
+#   options: a function(settings) returning a dictionary of any other arguments
+#   draw: a function(layout, settings) drawing the format's settings
+#   execution_context: the execution context to call the operator with
+#   estimate: rough (bytes per vertex, bytes per triangle) of its files, used by Plan
+#   texture_options: arguments making the operator refer to image files by relative path
+#       instead of embedding or copying them, used by Shared Textures (None if it can't)
+#   frame_range: for animation formats, a function(settings, scene) returning the (first, last)
+#       frame it exports, so Frames per Chunk can split it (None if it isn't animated)
+#   frame_options: a function(first, last) returning the arguments exporting only those frames
+#       (the scene's frame range is set to them too while exporting)
+#   stitch: a function(filepath, chunks) joining the files of each chunk (in order) into filepath,
+#       returning False if it can't on this computer
+#   sidecars: extensions of the files the operator can write next to the file with its name,
+#       for example ".mtl", so post processing finds them without Atomic Writes
+class ExportFormat:
+    def __init__(self, identifier, name, number, operator, extension,
+                 selection=("use_selection", True), modifiers=None, preset=None,
+                 options=None, draw=None, execution_context='EXEC_DEFAULT', description="",
+                 estimate=(40, 12), texture_options=None, frame_range=None, frame_options=None,
+                 stitch=None, sidecars=()):
+        self.identifier = identifier
+        self.name = name
+        self.number = number
+        self.operator = operator
+        self.extension = extension
+        self.selection = selection
+        self.modifiers = modifiers
+        self.preset = preset
+        self.options = options
+        self.draw = draw
+        self.execution_context = execution_context
+        self.description = description
+        self.estimate = estimate
+        self.texture_options = texture_options
+        self.frame_range = frame_range
+        self.frame_options = frame_options
+        self.stitch = stitch
+        self.sidecars = sidecars
+
+    # Resolves the operator, preset and options for the given settings,
+    # so exporting each item only needs to add the file path
+    def prepare(self, settings):
+        options = {}
+        if self.preset:
+            options = load_operator_preset(self.operator, getattr(settings, self.preset))
+        if self.options:
+            options.update(self.options(settings))
+        options[self.selection[0]] = self.selection[1]
+        if self.modifiers:
+            options[self.modifiers] = settings.apply_mods
+        if settings.share_textures and self.texture_options:
+            # Left out on Blender versions whose operator doesn't have them
+            properties = get_operator_properties(self.operator) or ()
+            options.update((key, value) for key, value in self.texture_options.items()
+                           if key in properties)
+
+        extension = self.extension
+        if callable(extension):
+            extension = extension(settings, options)
+
+        return ExportCall(self, self.get_operator(), options, extension)
+
+    def get_operator(self):
+        category, name = self.operator.split(".")
+        return getattr(getattr(bpy.ops, category), name)
+
+    # Draws the format's settings, by default only its preset
+    def draw_settings(self, layout, settings):
+        if self.draw:
+            self.draw(layout, settings)
+        elif self.preset:
+            draw_preset(layout, settings, self.preset)
+
+# An export format prepared with the settings of one run, called with the file path of each item.
+# lod is the (number, ratio) of the level of detail it exports, or None.
+# frames is the (first, last) frame of the chunk it exports, or None.
+class ExportCall:
+    def __init__(self, export_format, operator, options, extension, lod=None, frames=None):
+        self.export_format = export_format
+        self.operator = operator
+        self.options = options
+        self.extension = extension
+        self.lod = lod
+        self.frames = frames
+
+    # Returns a copy exporting a level of detail. Its name goes before the extension,
+    # so everything naming an item's files (incremental, shared meshes...) names its LODs too.
+    def for_lod(self, number, ratio):
+        return ExportCall(self.export_format, self.operator, self.options,
+                          "_LOD" + str(number) + self.extension, (number, ratio))
+
+    # Returns a copy exporting one chunk of the frame range, to a file named after its frames
+    def for_frames(self, first, last):
+        options = dict(self.options)
+        options.update(self.export_format.frame_options(first, last))
+        return ExportCall(self.export_format, self.operator, options,
+                          chunk_extension(first, last, self.extension), self.lod, (first, last))
+
+    def __call__(self, filepath):
+        options = dict(self.options)
+        options["filepath"] = filepath
+        self.operator(self.export_format.execution_context, **options)
+
+    # Returns the call as JSON friendly types, so parallel workers export with exactly the
+    # options the main process resolved. The options are kept as their repr, since preset
+    # options can be tuples and sets.
+    def to_shard(self, directory):
+        return {"directory": directory, "format": self.export_format.identifier,
+                "options": repr(self.options), "extension": self.extension,
+                "lod": list(self.lod) if self.lod else None}
+
+    # Returns the (directory, ExportCall) written by to_shard
+    @staticmethod
+    def from_shard(data):
+        export_format = export_formats[data["format"]]
+        return data["directory"], ExportCall(
+            export_format, export_format.get_operator(), ast.literal_eval(data["options"]),
+            data["extension"], tuple(data["lod"]) if data["lod"] else None)
+
+# Returns the extension of the file of a chunk of frames, which goes after the item's name
+def chunk_extension(first, last, extension):
+    return "_f%04d-%04d" % (first, last) + extension
+
+# Returns the (first, last) frame of each chunk of at most size frames from first to last
+def frame_chunks(first, last, size):
+    return [(start, min(start + size - 1, last)) for start in range(first, last + 1, size)]
+
+# Lists the chunk files of an item that couldn't be stitched together in a
+# name_chunks.json next to them, with the frames in each. Returns its path.
+def write_chunk_list(filepath, chunks, frames):
+    fp = os.path.splitext(filepath)[0] + "_chunks.json"
+    with open(fp, 'w') as file:
+        json.dump({"version": 1, "file": os.path.basename(filepath),
+                   "chunks": [{"file": os.path.basename(chunk), "frames": list(chunk_frames)}
+                              for chunk, chunk_frames in zip(chunks, frames)]}, file, indent=1)
+    return fp
+
+# Sets a scene's frame range, in the order that never makes the end come before the start
+def set_frame_range(scene, first, last):
+    if first > scene.frame_end:
+        scene.frame_end = last
+        scene.frame_start = first
+    else:
+        scene.frame_start = first
+        scene.frame_end = last
+
+# A Dictionary of identifier: ExportFormat for every format that can be exported to
+export_formats = {}
+# The Format EnumProperty's items, kept referenced like the preset enum items
+format_enum_items = []
+
+def update_format_enum_items():
+    format_enum_items[:] = [(f.identifier, f.name, f.description, f.number)
+                            for f in export_formats.values()]
+
+# Adds a format to the Format choices, replacing any format with the same identifier
+def register_export_format(export_format):
+    export_formats[export_format.identifier] = export_format
+    update_format_enum_items()
+
+def unregister_export_format(identifier):
+    export_formats.pop(identifier, None)
+    update_format_enum_items()
+
+# Draws a preset's EnumProperty, with a button to look for new presets
+def draw_preset(layout, settings, preset):
+    row = layout.row(align=True)
+    row.prop(settings, preset + "_enum")
+    row.operator('export_mesh.batch_refresh_presets', text='', icon='FILE_REFRESH')
+
+def draw_abc_settings(layout, settings):
+    draw_preset(layout, settings, 'abc_preset')
+    layout.prop(settings, 'frame_start')
+    layout.prop(settings, 'frame_end')
+    layout.prop(settings, 'frame_chunk')
+
+def draw_usd_settings(layout, settings):
+    layout.prop(settings, 'usd_format')
+    draw_preset(layout, settings, 'usd_preset')
+    layout.prop(settings, 'frame_chunk')
+
+# Joins Alembic chunks with abcstitcher (a tool that comes with Alembic), if it's on the PATH
+def stitch_alembic(filepath, chunks):
+    tool = shutil.which("abcstitcher")
+    if not tool:
+        return False
+    subprocess.run([tool, filepath] + chunks, check=True, capture_output=True)
+    return True
+
+# Joins USD chunks by merging their time samples into one layer, if Blender's Python has
+# the USD Python module (pxr, which comes with Blender 4.0 and later)
+def stitch_usd(filepath, chunks):
+    try:
+        from pxr import Sdf, UsdUtils
+    except ImportError:
+        return False
+    if os.path.exists(filepath):
+        os.remove(filepath)
+    layer = Sdf.Layer.CreateNew(filepath)
+    for chunk in chunks:
+        UsdUtils.StitchLayers(layer, Sdf.Layer.FindOrOpen(chunk))
+    layer.Save()
+    return True
+
+def gltf_extension(settings, options):
+    return ".glb" if options.get('export_format', 'GLB') == 'GLB' else ".gltf"
+
+# The formats Blender comes with, in the order they're shown
+builtin_export_formats = [
+    ExportFormat('DAE', "Collada (.dae)", 1, 'wm.collada_export', ".dae",
+                 selection=("selected", True), modifiers="apply_modifiers", preset='dae_preset',
+                 estimate=(90, 30), texture_options={"use_texture_copies": False}),
+    # By default, alembic_export operator runs in the background, this messes up batch
+    # export though. alembic_export has an "as_background_job" arg that can be set to
+    # false to disable it, but its marked deprecated, saying that if you EXECUTE the
+    # operator rather than INVOKE it it runs in the foreground. Here I change the
+    # execution context to EXEC_REGION_WIN.
+    # docs.blender.org/api/current/bpy.ops.html?highlight=exec_default#execution-context
+    ExportFormat('ABC', "Alembic (.abc)", 9, 'wm.alembic_export', ".abc",
+                 selection=("selected", True), preset='abc_preset',
+                 options=lambda settings: {"start": settings.frame_start, "end": settings.frame_end},
+                 draw=draw_abc_settings, execution_context='EXEC_REGION_WIN', estimate=(40, 16),
+                 frame_range=lambda settings, scene: (settings.frame_start, settings.frame_end),
+                 frame_options=lambda first, last: {"start": first, "end": last},
+                 stitch=stitch_alembic),
+    ExportFormat('USD', "Universal Scene Description (.usd/.usdc/.usda)", 2, 'wm.usd_export',
+                 lambda settings, options: settings.usd_format,
+                 selection=("selected_objects_only", True), preset='usd_preset',
+                 draw=draw_usd_settings, estimate=(40, 16),
+                 texture_options={"export_textures": False, "relative_paths": True},
+                 frame_range=lambda settings, scene: (scene.frame_start, scene.frame_end),
+                 frame_options=lambda first, last: {"export_animation": True},
+                 stitch=stitch_usd),
+    ExportFormat('SVG', "Grease Pencil as SVG (.svg)", 10, 'wm.gpencil_export_svg', ".svg",
+                 selection=("selected_object_type", 'SELECTED')),
+    ExportFormat('PDF', "Grease Pencil as PDF (.pdf)", 11, 'wm.gpencil_export_pdf', ".pdf",
+                 selection=("selected_object_type", 'SELECTED')),
+    ExportFormat('OBJ', "Wavefront (.obj)", 7, 'wm.obj_export', ".obj",
+                 selection=("export_selected_objects", True), modifiers="apply_modifiers",
+                 preset='obj_preset', estimate=(80, 40), texture_options={"path_mode": 'RELATIVE'},
+                 sidecars=(".mtl",)),
+    ExportFormat('PLY', "Stanford (.ply)", 3, 'export_mesh.ply', ".ply",
+                 modifiers="use_mesh_modifiers",
+                 options=lambda settings: {"use_ascii": settings.ply_ascii},
+                 draw=lambda layout, settings: layout.prop(settings, 'ply_ascii'), estimate=(32, 13)),
+    ExportFormat('STL', "STL (.stl)", 4, 'export_mesh.stl', ".stl",
+                 modifiers="use_mesh_modifiers",
+                 options=lambda settings: {"ascii": settings.stl_ascii},
+                 draw=lambda layout, settings: layout.prop(settings, 'stl_ascii'), estimate=(0, 50)),
+    ExportFormat('FBX', "FBX (.fbx)", 5, 'export_scene.fbx', ".fbx",
+                 modifiers="use_mesh_modifiers", preset='fbx_preset', estimate=(44, 16),
+                 texture_options={"path_mode": 'RELATIVE', "embed_textures": False}),
+    ExportFormat('glTF', "glTF (.glb/.gltf)", 6, 'export_scene.gltf', gltf_extension,
+                 modifiers="export_apply", preset='gltf_preset', estimate=(32, 12), sidecars=(".bin",)),
+    ExportFormat('X3D', "X3D Extensible 3D (.x3d)", 8, 'export_scene.x3d', ".x3d",
+                 modifiers="use_mesh_modifiers", preset='x3d_preset', estimate=(70, 30),
+                 texture_options={"path_mode": 'RELATIVE'}),
+]
+for export_format in builtin_export_formats:
+    register_export_format(export_format)
+
+# Returns a list of (directory, ExportCall), one for each format the run exports to.
+# Raises ValueError if a format isn't available. The format subdirectories are
+# created unless create_dirs is False (for a dry run, which shouldn't write anything).
+def prepare_export_calls(settings, base_dir, create_dirs=True):
+    targets = [(settings.file_format, "")]
+    if settings.multi_format:
+        targets = [(target.file_format, target.subdirectory) for target in settings.formats]
+        if not targets:
+            raise ValueError("Add at least one format to export to")
+
+    export_calls = []
+    for file_format, subdirectory in targets:
+        export_format = export_formats.get(file_format)
+        if not export_format:
+            raise ValueError("Export format isn't available (was the addon adding it disabled?)")
+        directory = os.path.join(base_dir, bpy.path.clean_name(subdirectory)) if subdirectory else base_dir
+        if create_dirs:
+            os.makedirs(directory, exist_ok=True)
+        export_calls.append((directory, export_format.prepare(settings)))
+
+    if settings.use_lods:
+        if not settings.apply_mods and any(call.export_format.modifiers for d, call in export_calls):
+            raise ValueError("LODs are made with modifiers, turn on Apply Modifiers to export them")
+        # Every format of one LOD after another, so each LOD's modifiers are only added once per item
+        ratios = parse_lod_ratios(settings.lod_ratios)
+        export_calls = [(directory, export_call.for_lod(number, ratio))
+                        for number, ratio in enumerate(ratios)
+                        for directory, export_call in export_calls]
+    return export_calls
+
+# Returns the list of ratios in a comma separated string like "1, 0.5, 0.25"
+def parse_lod_ratios(text):
+    try:
+        ratios = [float(ratio) for ratio in text.split(",") if ratio.strip()]
+    except ValueError:
+        raise ValueError("LOD Ratios should be numbers separated by commas, like 1, 0.5, 0.25")
+    if not ratios or not all(0.0 < ratio <= 1.0 for ratio in ratios):
+        raise ValueError("LOD Ratios should be more than 0 and at most 1")
+    return ratios
+
+# Adds a Decimate modifier to the end of each mesh object's modifiers (for a LOD),
+# returns the (object, modifier) added so they can be removed after exporting
+def add_lod_modifiers(objects, ratio):
+    added = []
+    try:
+        for obj in objects:
+            if obj.type != 'MESH' or obj.library:
+                continue
+            mod = obj.modifiers.new("batch_export_lod", 'DECIMATE')
+            added.append((obj, mod))
+            mod.ratio = ratio
+    except Exception:
+        remove_lod_modifiers(added)
+        raise
+    return added
+
+def remove_lod_modifiers(added):
+    for obj, mod in added:
+        obj.modifiers.remove(mod)
+
+# Sets the transform overrides from settings on obj
+def set_transform_overrides(obj, settings):
+    # If exporting by parent, don't set child (object that has a parent) transform
+    if settings.mode != "OBJECT_PARENTS" or not obj.parent:
+        if settings.set_location:
+            obj.location = settings.location
+        if settings.set_rotation:
+            obj.rotation_euler = settings.rotation
+        if settings.set_scale:
+            obj.scale = settings.scale
+
+# Copies the values of a struct's editable properties to another struct of the same type
+def copy_rna(src, dst):
+    for prop in src.bl_rna.properties:
+        if prop.identifier == 'rna_type' or prop.is_readonly or prop.type in ('POINTER', 'COLLECTION'):
+            continue
+        try:
+            setattr(dst, prop.identifier, getattr(src, prop.identifier))
+        except (AttributeError, TypeError, ValueError):
+            pass
+
+# Points the object references of a staging copy's modifiers and constraints (like an
+# Armature modifier's rig, or a constraint's target and its targets list) that refer to
+# an object of the item at that object's copy, so the copies deform and follow each
+# other rather than the originals. copies is {original pointer: copy}.
+def point_at_copies(copy, copies):
+    for owner in list(copy.modifiers) + list(copy.constraints):
+        holders = [owner]
+        for prop in owner.bl_rna.properties:
+            if prop.type == 'COLLECTION' and prop.identifier != 'rna_type':
+                holders += list(getattr(owner, prop.identifier))
+        for holder in holders:
+            for prop in holder.bl_rna.properties:
+                if prop.type != 'POINTER' or prop.is_readonly or prop.fixed_type.identifier != 'Object':
+                    continue
+                target = getattr(holder, prop.identifier)
+                if target is not None and target.as_pointer() in copies:
+                    setattr(holder, prop.identifier, copies[target.as_pointer()])
+
+# Creates the empty scene items are exported from when using staging copies,
+# with the scene settings exporters read (units, frame range and frame rate) copied from scene
+def create_staging_scene(scene):
+    staging = bpy.data.scenes.new(".batch_export_staging")
+    copy_rna(scene.unit_settings, staging.unit_settings)
+    staging.frame_end = scene.frame_end
+    staging.frame_start = scene.frame_start
+    staging.frame_current = scene.frame_current
+    staging.render.fps = scene.render.fps
+    staging.render.fps_base = scene.render.fps_base
+    return staging
+
+# Returns the full path of the file an item will be exported to
+def item_filepath(settings, base_dir, itemname, extension):
+    name = settings.prefix + bpy.path.clean_name(itemname) + settings.suffix
+    return os.path.join(base_dir, name) + extension
+
+# Name of the file in the export directory that remembers the fingerprint
+# of every item exported there, used by incremental export
+manifest_name = ".batch_export_manifest.json"
+
+# Returns the {file path relative to base_dir: fingerprint} saved in base_dir
+def load_manifest(base_dir):
+    try:
+        with open(os.path.join(base_dir, manifest_name), 'r') as file:
+            manifest = json.load(file)
+        return dict(manifest["items"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return {}
+
+def save_manifest(base_dir, fingerprints):
+    # Written next to it then renamed, so a crash never leaves half a manifest
+    fp = os.path.join(base_dir, manifest_name)
+    with open(fp + ".partial", 'w') as file:
+        json.dump({"version": 1, "items": fingerprints}, file, indent=1, sort_keys=True)
+    os.replace(fp + ".partial", fp)
+
+# Start of the name of the hidden folders files are exported into before they're moved into place
+partial_prefix = ".batch_export_partial_"
+
+# Exports filepath with export_call into a hidden folder in the same directory, then
+# moves everything the exporter wrote into place, so a crash or failed export never
+# leaves a half written file where other tools would pick it up. The files are written
+# with their final names, so files referring to each other (.obj and .mtl, .gltf and .bin)
+# still do, and filepath itself is moved last. Moving within a directory is a rename,
+# so it takes the same time however big the files are. Returns the paths of every file
+# the exporter wrote, with filepath last.
+def export_atomic(export_call, filepath):
+    directory, name = os.path.split(filepath)
+    temp_dir = tempfile.mkdtemp(prefix=partial_prefix, dir=directory)
+    try:
+        export_call(os.path.join(temp_dir, name))
+        written = []
+        for root, dirs, files in os.walk(temp_dir):
+            written += [os.path.relpath(os.path.join(root, f), temp_dir) for f in files]
+        written.sort(key=lambda path: path == name)
+        for path in written:
+            dst = os.path.join(directory, path)
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(dst), exist_ok=True)
+            os.replace(os.path.join(temp_dir, path), dst)
+        return [os.path.join(directory, path) for path in written]
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+# Removes the hidden folders left in directory by exports that crashed part way through
+# (only called while holding the directory's lock, so they can't be another run's)
+def remove_partial_exports(directory):
+    for name in os.listdir(directory):
+        if name.startswith(partial_prefix):
+            shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+# Name of the file in the export directory saying which run is exporting there,
+# used by Lock Directory
+lock_name = ".batch_export.lock"
+
+# Returns whether a process with this id is running on this computer
+def process_running(pid):
+    if sys.platform == 'win32':
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        kernel32.CloseHandle(handle)
+        return True
+    try:
+        os.kill(pid, 0)  # Signal 0 only checks the process exists
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # It exists, but belongs to another user
+    return True
+
+# Returns whether a lock was left behind by a run that isn't exporting anymore: one from
+# this computer whose Blender has closed (or this Blender, from an export that failed).
+# Locks from other computers can't be checked, so they're never stale.
+def lock_is_stale(owner):
+    if owner.get("host") != socket.gethostname() or not isinstance(owner.get("pid"), int):
+        return False
+    return owner["pid"] == os.getpid() or not process_running(owner["pid"])
+
+# Claims base_dir for this run by creating a lock file in it (which only one run can do,
+# even on a network share), so two runs exporting to the same directory don't overwrite
+# each other's files. Stale locks are taken over. Returns the lock file's path.
+# Raises ValueError if another run is exporting there.
+def acquire_directory_lock(base_dir):
+    fp = os.path.join(base_dir, lock_name)
+    owner = {"host": socket.gethostname(), "pid": os.getpid(),
+             "blend_file": bpy.data.filepath, "started": time.time()}
+    for attempt in range(2):
+        try:
+            fd = os.open(fp, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                with open(fp, 'r') as file:
+                    other = json.load(file)
+            except (OSError, ValueError):
+                other = {}  # Still being written, or not ours
+            if attempt == 0 and isinstance(other, dict) and lock_is_stale(other):
+                try:
+                    os.remove(fp)
+                except FileNotFoundError:
+                    pass
+                continue
+            if not isinstance(other, dict):
+                other = {}
+            raise ValueError(
+                "Another batch export is exporting to this directory (" +
+                os.path.basename(str(other.get("blend_file") or "unsaved file")) + " on " +
+                str(other.get("host", "unknown computer")) + ")\nIf it isn't running anymore, delete " +
+                os.path.join(base_dir, lock_name))
+        with os.fdopen(fd, 'w') as file:
+            json.dump(owner, file)
+        return fp
+    raise ValueError("Couldn't lock the export directory")
+
+def release_directory_lock(fp):
+    try:
+        os.remove(fp)
+    except OSError:
+        pass
+
+# Adds the values of a struct's editable properties to hash h
+# (other datablocks are added by name, so changes inside them aren't noticed)
+def hash_rna(struct, h):
+    for prop in struct.bl_rna.properties:
+        if prop.identifier == 'rna_type' or prop.is_readonly or prop.type == 'COLLECTION':
+            continue
+        value = getattr(struct, prop.identifier, None)
+        if isinstance(value, bpy.types.ID):
+            value = value.name
+        elif prop.type == 'POINTER':
+            continue
+        elif isinstance(value, set):
+            value = tuple(sorted(value))
+        elif hasattr(value, "__len__") and not isinstance(value, str):
+            value = tuple(value)
+        h.update((prop.identifier + "=" + repr(value) + ";").encode())
+
+# Adds a mesh's geometry (vertex positions, faces and UVs) to hash h
+def hash_mesh(mesh, h):
+    co = array.array('f', [0.0]) * (len(mesh.vertices) * 3)
+    mesh.vertices.foreach_get('co', co)
+    h.update(co.tobytes())
+    loops = array.array('i', [0]) * len(mesh.loops)
+    mesh.loops.foreach_get('vertex_index', loops)
+    h.update(loops.tobytes())
+    loop_totals = array.array('i', [0]) * len(mesh.polygons)
+    mesh.polygons.foreach_get('loop_total', loop_totals)
+    h.update(loop_totals.tobytes())
+    for uv_layer in mesh.uv_layers:
+        uvs = array.array('f', [0.0]) * (len(uv_layer.data) * 2)
+        uv_layer.data.foreach_get('uv', uvs)
+        h.update(uv_layer.name.encode())
+        h.update(uvs.tobytes())
+
+# Returns a fingerprint of everything from the scene that goes into an item's
+# exported files: its objects' data, modifiers, materials and transforms
+# (with the transform overrides applied).
+def item_fingerprint(settings, item_objects):
+    h = hashlib.sha1()
+    for key in ('mode', 'set_location', 'set_rotation', 'set_scale'):
+        h.update(repr(getattr(settings, key)).encode())
+
+    for obj in sorted(item_objects, key=lambda obj: obj.name):
+        h.update((obj.name + obj.type).encode())
+        location = obj.location
+        rotation = obj.rotation_euler
+        scale = obj.scale
+        # The same transforms export_selection sets
+        if settings.mode != "OBJECT_PARENTS" or not obj.parent:
+            if settings.set_location:
+                location = settings.location
+            if settings.set_rotation:
+                rotation = settings.rotation
+            if settings.set_scale:
+                scale = settings.scale
+        h.update(repr((tuple(location), tuple(rotation), tuple(scale))).encode())
+        if obj.parent:
+            h.update(obj.parent.name.encode())
+            h.update(repr([tuple(row) for row in obj.matrix_parent_inverse]).encode())
+        if obj.animation_data and obj.animation_data.action:
+            h.update(obj.animation_data.action.name.encode())
+
+        if obj.data:
+            h.update(obj.data.name.encode())
+            hash_rna(obj.data, h)
+            if obj.type == 'MESH':
+                hash_mesh(obj.data, h)
+        for mod in obj.modifiers:
+            hash_rna(mod, h)
+        for slot in obj.material_slots:
+            if not slot.material:
+                continue
+            h.update(slot.material.name.encode())
+            hash_rna(slot.material, h)
+            if slot.material.node_tree:
+                for node in slot.material.node_tree.nodes:
+                    h.update((node.name + node.bl_idname).encode())
+                    for node_input in node.inputs:
+                        if hasattr(node_input, "default_value") and not node_input.is_linked:
+                            value = node_input.default_value
+                            if hasattr(value, "__len__"):
+                                value = tuple(value)
+                            h.update(repr(value).encode())
+                    if getattr(node, "image", None):
+                        h.update(node.image.filepath.encode())
+    return h.hexdigest()
+
+# Returns the fingerprint of one exported file, from the fingerprint of its item
+# and the format and options the exporter is called with.
+# If two fingerprints match, the exported files would be the same.
+def file_fingerprint(item_fingerprint, export_call):
+    h = hashlib.sha1(item_fingerprint.encode())
+    h.update(export_call.export_format.identifier.encode())
+    h.update(repr(sorted((k, repr(v)) for k, v in export_call.options.items())).encode())
+    if export_call.lod:
+        h.update(repr(export_call.lod).encode())
+    return h.hexdigest()
+
+# Removes items from the list that haven't changed since they were last exported
+# and whose files all still exist. export_calls is the list of (directory,
+# ExportCall) each item is exported with. Returns the (items to export,
+# {file path relative to base_dir: fingerprint} for them, number of items skipped)
+def filter_unchanged_items(settings, base_dir, items, export_calls, manifest):
+    changed = []
+    fingerprints = {}
+    for itemname, item_objects in items:
+        item_fp = item_fingerprint(settings, item_objects)
+        item_fingerprints = {}
+        unchanged = True
+        for directory, export_call in export_calls:
+            fp = item_filepath(settings, directory, itemname, export_call.extension)
+            key = os.path.relpath(fp, base_dir)
+            item_fingerprints[key] = file_fingerprint(item_fp, export_call)
+            if manifest.get(key) != item_fingerprints[key] or not os.path.isfile(fp):
+                unchanged = False
+        if unchanged:
+            continue
+        changed.append((itemname, item_objects))
+        fingerprints.update(item_fingerprints)
+    return changed, fingerprints, len(items) - len(changed)
+
+# The report of the last batch export run, shown in the UI.
+# Has the timings of each step of the run, and of each item exported.
+last_report = {}
+
+# Name of the report file written next to the exported files (without the extension)
+report_name = "batch_export_report"
+# Columns of the CSV report, one row per item (times are in seconds)
+report_columns = ["name", "frames", "files", "bytes", "total", "select",
+                  "transform_set", "export", "transform_reset", "stitch"]
+
+# Writes the report of a run to base_dir as JSON (all the timings) or CSV (one row per item)
+def write_report(base_dir, report_format, report):
+    if report_format == 'JSON':
+        with open(os.path.join(base_dir, report_name + ".json"), 'w') as file:
+            json.dump(report, file, indent=1)
+    elif report_format == 'CSV':
+        with open(os.path.join(base_dir, report_name + ".csv"), 'w', newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=report_columns, extrasaction='ignore')
+            writer.writeheader()
+            for record in report["items"]:
+                writer.writerow(dict(record, files=";".join(record.get("files", [])),
+                                     frames="-".join(str(f) for f in record.get("frames", []))))
+
+# Name of the index of the files a run exported (without the extension), for downstream
+# tools to look assets up without opening them
+index_name = "batch_export_index"
+
+# Returns what the index lists about an item's geometry as exported: its vertex and
+# triangle counts, its world space bounding box ([min xyz, max xyz], or None if it has no
+# geometry) and its material names. objects are the objects being exported (with their
+# transforms set), depsgraph the evaluated depsgraph they're exported from.
+def item_summary(objects, depsgraph, apply_mods):
+    vertices, faces, triangles = item_geometry_counts(objects, depsgraph, apply_mods)
+    low = [float("inf")] * 3
+    high = [float("-inf")] * 3
+    materials = []
+    for obj in objects:
+        for slot in obj.material_slots:
+            if slot.material and slot.material.name not in materials:
+                materials.append(slot.material.name)
+        if obj.type not in ('MESH', 'CURVE', 'SURFACE', 'META', 'FONT'):
+            continue
+        obj_eval = obj.evaluated_get(depsgraph)
+        matrix = obj_eval.matrix_world
+        for corner in obj_eval.bound_box:
+            co = matrix @ Vector(corner)
+            for axis in range(3):
+                low[axis] = min(low[axis], co[axis])
+                high[axis] = max(high[axis], co[axis])
+    bounds = [low, high] if low[0] <= high[0] else None
+    return {"vertices": vertices, "triangles": triangles, "bounds": bounds, "materials": materials}
+
+# Returns the index entry of one exported file (its size and hash are added by
+# hash_index_entries once post processing is done with it). object_names are the names of
+# item_objects, taken before staging renamed them.
+def index_entry(base_dir, fp, export_call, itemname, item_objects, object_names, summary):
+    collections = []
+    for obj in item_objects:
+        for col in obj.users_collection:
+            if col.name not in collections:
+                collections.append(col.name)
+    return dict({
+        "file": os.path.relpath(fp, base_dir).replace(os.sep, "/"),
+        "format": export_call.export_format.identifier,
+        "lod": export_call.lod[0] if export_call.lod else None,
+        "item": itemname,
+        "objects": object_names,
+        "collections": collections,
+    }, **summary)
+
+# Returns the (bytes, sha1) of the file at path, or (None, None) if it's gone
+def file_size_and_hash(path):
+    if not os.path.isfile(path):
+        return None, None
+    return os.path.getsize(path), hash_source(path)
+
+# Adds the size and hash of each indexed file in the item reports, as they are after
+# post processing (None if it removed the file), and what post processing wrote from
+# it as "outputs". Runs after finish_post_processing. Entries that already have them
+# (from workers) are left as they are.
+def hash_index_entries(base_dir, records):
+    for record in records:
+        for entry in record.get("index", []):
+            if "sha1" in entry:
+                continue
+            # Index paths use / on every system, so compare them with the results' paths normalized
+            fp = os.path.normpath(os.path.join(base_dir, entry["file"]))
+            entry["bytes"], entry["sha1"] = file_size_and_hash(fp)
+            entry["outputs"] = []
+            for result in record.get("post_process", []):
+                out = result.get("output")
+                # A zip holds all of the item's files, other steps write one file from each
+                if not out or os.path.normpath(out) == fp or (
+                        os.path.normpath(result["file"]) != fp and result["step"] != 'ZIP'):
+                    continue
+                size, digest = file_size_and_hash(out)
+                entry["outputs"].append({"file": os.path.relpath(out, base_dir).replace(os.sep, "/"),
+                                         "step": result["step"], "bytes": size, "sha1": digest})
+
+# Writes the index of the exported files to base_dir as JSON, and with 'BINARY'
+# also as a compact binary file (see the README for its layout)
+def write_index(base_dir, index_format, entries):
+    with open(os.path.join(base_dir, index_name + ".json"), 'w') as file:
+        json.dump({"version": 1, "files": entries}, file, indent=1)
+    if index_format != 'BINARY':
+        return
+
+    # Every string is stored once, entries refer to them by their number
+    strings = {}
+    def string(text):
+        return strings.setdefault(text, len(strings))
+    def string_list(texts):
+        return struct.pack("<I", len(texts)) + struct.pack("<%dI" % len(texts), *[string(t) for t in texts])
+
+    # Files post processing removed have all ones for their size and zeros for their hash
+    def fingerprint(size, digest):
+        if digest is None:
+            return struct.pack("<Q20s", 0xFFFFFFFFFFFFFFFF, bytes(20))
+        return struct.pack("<Q20s", size, bytes.fromhex(digest))
+
+    nan = float("nan")
+    packed = []
+    for entry in entries:
+        bounds = entry["bounds"] or [[nan] * 3, [nan] * 3]
+        outputs = entry["outputs"]
+        packed.append(
+            struct.pack("<IIIi", string(entry["file"]), string(entry["format"]), string(entry["item"]),
+                        -1 if entry["lod"] is None else entry["lod"]) +
+            fingerprint(entry["bytes"], entry["sha1"]) +
+            struct.pack("<QQ6f", entry["vertices"], entry["triangles"], *bounds[0], *bounds[1]) +
+            string_list(entry["materials"]) + string_list(entry["objects"]) +
+            string_list(entry["collections"]) + struct.pack("<I", len(outputs)) +
+            b"".join(struct.pack("<II", string(out["file"]), string(out["step"])) +
+                     fingerprint(out["bytes"], out["sha1"]) for out in outputs))
+    with open(os.path.join(base_dir, index_name + ".bin"), 'wb') as file:
+        file.write(struct.pack("<4sHII", b"SBEI", 1, len(strings), len(packed)))
+        for text in strings:
+            data = text.encode()
+            file.write(struct.pack("<I", len(data)) + data)
+        for data in packed:
+            file.write(data)
+
+# Returns {parent pointer: [children]} of the objects given. Built once per export,
+# since obj.children searches every object in the file each time it's used.
+def index_children(objects):
+    children = {}
+    for obj in objects:
+        if obj.parent:
+            children.setdefault(obj.parent.as_pointer(), []).append(obj)
+    return children
+
+# Appends every descendant of obj that's in eligible (a set of pointers) to selected,
+# parents before their children. Iterative, so deep hierarchies can't hit the recursion limit.
+def collect_children(obj, children, eligible, selected):
+    stack = list(reversed(children.get(obj.as_pointer(), ())))
+    while stack:
+        child = stack.pop()
+        if child.as_pointer() in eligible:
+            selected.append(child)
+        stack.extend(reversed(children.get(child.as_pointer(), ())))
+
+# Returns the collections used in the view layer (excluding the scene collection
+# and any excluded collections), in the order they appear in the outliner
+def view_layer_collections(view_layer):
+    collections = []
+    seen = set()  # A collection can be linked in more than one place
+    stack = list(reversed(view_layer.layer_collection.children))
+    while stack:
+        layer_col = stack.pop()
+        if layer_col.exclude or layer_col.collection.as_pointer() in seen:
+            continue
+        seen.add(layer_col.collection.as_pointer())
+        collections.append(layer_col.collection)
+        stack.extend(reversed(layer_col.children))
+    return collections
+
+# Decides what goes in which file. Returns a list of (item name, [objects]) tuples,
+# one for each file to export, using the mode, limit and object types in settings.
+def plan_export(context, settings):
+    objects = context.view_layer.objects.values()
+    if settings.limit == 'SELECTED':
+        objects = context.selected_objects
+
+    items = []
+    if settings.mode == 'OBJECTS':
+        for obj in objects:
+            if not obj.type in settings.object_types:
+                continue
+            items.append((obj.name, [obj]))
+
+    elif settings.mode == 'OBJECT_PARENTS':
+        # Children are found through every object in the view layer, so a hidden or
+        # unselected object in between doesn't cut off its children, but only the
+        # children that are visible or selected (and of the types chosen) are exported
+        children = index_children(context.view_layer.objects)
+        eligible = {obj.as_pointer() for obj in objects
+                    if obj.type in settings.object_types}
+        for obj in objects:
+            if obj.parent:  # if it has a parent, skip it for now, it'll be exported with its parent
+                continue
+            selected = []
+            if obj.as_pointer() in eligible:
+                selected.append(obj)
+            collect_children(obj, children, eligible, selected)
+            if selected:
+                items.append((obj.name, selected))
+
+    elif settings.mode == 'COLLECTIONS':
+        # Index the objects that can be exported once, so checking each object in
+        # each collection is a set lookup instead of a search through the list.
+        # Keyed by pointer since linked objects from different libraries can share names.
+        eligible = {obj.as_pointer() for obj in objects
+                    if obj.type in settings.object_types}
+        for col in view_layer_collections(context.view_layer):
+            selected = [obj for obj in col.objects if obj.as_pointer() in eligible]
+            if selected:
+                items.append((col.name, selected))
+
+    elif settings.mode in ('PROPERTY', 'NAME_PATTERN'):
+        # One pass over the objects into a {group: [objects]} index, in the order
+        # each group is first found
+        if settings.mode == 'PROPERTY':
+            if not settings.group_property:
+                raise ValueError("Choose the custom property to group objects by")
+            group_of = lambda obj: obj.get(settings.group_property)
+        else:
+            try:
+                pattern = re.compile(settings.group_pattern)
+            except re.error as e:
+                raise ValueError("Name Pattern isn't a valid regular expression: " + str(e))
+            def group_of(obj):
+                match = pattern.search(obj.name)
+                if match is None:
+                    return None
+                # The first group of the pattern if it has one, else everything it matched
+                return match.group(1) if pattern.groups else match.group(0)
+        groups = {}
+        for obj in objects:
+            if not obj.type in settings.object_types:
+                continue
+            group = group_of(obj)
+            if group is None or group == "":
+                continue
+            groups.setdefault(str(group), []).append(obj)
+        items = list(groups.items())
+
+    return items
+
+# Returns the values of the saved settings as JSON friendly types, so parallel workers
+# export with the settings of the run (which may not be saved in the .blend file,
+# like command line overrides) rather than the ones in the file
+def settings_values(settings):
+    values = {}
+    for prop in settings.bl_rna.properties:
+        if (prop.identifier == 'rna_type' or prop.is_readonly or prop.is_skip_save
+                or prop.type in ('POINTER', 'COLLECTION')):
+            continue
+        value = getattr(settings, prop.identifier)
+        if isinstance(value, set):
+            value = sorted(value)
+        elif hasattr(value, "__len__") and not isinstance(value, str):
+            value = list(value)
+        values[prop.identifier] = value
+    return values
+
+def set_settings_values(settings, values):
+    for identifier, value in values.items():
+        prop = settings.bl_rna.properties[identifier]
+        if prop.type == 'ENUM' and prop.is_enum_flag:
+            value = set(value)
+        setattr(settings, identifier, value)
+
+# A background Blender process exporting one shard of a parallel batch export.
+# It opens the saved .blend file and runs the batch export operator with the
+# shard file, which lists the items it should export.
+class ExportWorker:
+    def __init__(self, index, shard_path, shard):
+        self.index = index
+        self.shard_path = shard_path
+        self.shard = shard
+        self.exported = 0  # Counted from the worker's output while it runs
+        self.process = None
+        self.thread = None
+
+    def start(self):
+        args = [
+            bpy.app.binary_path, "--background", bpy.data.filepath,
+            "--addons", __name__,
+            "--python-expr", "import bpy; bpy.ops.export_mesh.batch(shard=" + repr(self.shard_path) + ")",
+        ]
+        self.process = subprocess.Popen(
+            args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+        # Read the output in a thread so a full pipe never blocks the worker
+        self.thread = threading.Thread(target=self.read_output, daemon=True)
+        self.thread.start()
+
+    def read_output(self):
+        for line in self.process.stdout:
+            if line.startswith("exported: "):
+                self.exported += 1
+            print("[worker " + str(self.index) + "] " + line, end="")
+
+    def running(self):
+        return self.process is not None and self.process.poll() is None
+
+    # Waits for the worker to end, killing it if it's still running
+    # (only happens if the main process was interrupted)
+    def stop(self):
+        if self.running():
+            self.process.terminate()
+        if self.process is not None:
+            self.process.wait()
+        if self.thread is not None:
+            self.thread.join()
+
+    # Returns the (exported file paths, failed items, item timings, items it didn't get to)
+    # reported by the worker. Workers stop early when they go over the Memory Limit.
+    def results(self):
+        try:
+            with open(self.shard["result"], 'r') as file:
+                result = json.load(file)
+            return result["exported"], result["failed"], result["items"], result.get("remaining", [])
+        except (OSError, ValueError, KeyError):
+            # The worker crashed before writing its results, so count its whole shard as failed
+            error = "Worker exited with code " + str(self.process.returncode)
+            return [], [{"name": item["name"], "error": error} for item in self.shard["items"]], [], []
 
 # Draws the .blend file specific settings used in the
 # Popover panel or Side Panel panel
@@ -82,53 +1174,79 @@ def draw_settings(self, context):
     self.layout.use_property_decorate = False
 
     settings = context.scene.batch_export
-    self.layout.operator('export_mesh.batch', icon='EXPORT')
+    row = self.layout.row(align=True)
+    row.operator('export_mesh.batch', icon='EXPORT')
+    row.operator('export_mesh.batch', text="Plan", icon='VIEWZOOM').dry_run = True
 
     self.layout.separator()
     col = self.layout.column(align=True)
     col.prop(settings, 'directory')
     col.prop(settings, 'prefix')
     col.prop(settings, 'suffix')
+    col.prop(settings, 'report_format')
+    col.prop(settings, 'index_format')
+    col.prop(settings, 'atomic_writes')
+    col.prop(settings, 'lock_directory')
 
     self.layout.separator()
     col = self.layout.column(align=True)
     col.label(text="Export Settings:")
-    col.prop(settings, 'file_format')
+    col.prop(settings, 'multi_format')
+    if settings.multi_format:
+        for i, target in enumerate(settings.formats):
+            row = col.row(align=True)
+            row.prop(target, 'file_format', text="")
+            row.prop(target, 'subdirectory', text="")
+            row.operator('export_mesh.batch_format_remove', text='', icon='X').index = i
+        col.operator('export_mesh.batch_format_add', icon='ADD')
+    else:
+        col.prop(settings, 'file_format')
     col.prop(settings, 'mode')
+    if settings.mode == 'PROPERTY':
+        col.prop(settings, 'group_property')
+    elif settings.mode == 'NAME_PATTERN':
+        col.prop(settings, 'group_pattern')
     col.prop(settings, 'limit')
+    if settings.mode in ('OBJECTS', 'OBJECT_PARENTS'):
+        col.prop(settings, 'dedup')
+        if settings.dedup != 'NONE':
+            col.prop(settings, 'dedup_geometry')
+    col.prop(settings, 'incremental')
+    col.prop(settings, 'use_modal')
+    col.prop(settings, 'parallel')
+    if settings.parallel:
+        col.prop(settings, 'worker_count')
+    col.prop(settings, 'memory_limit')
+    col.prop(settings, 'cleanup_interval')
 
     self.layout.separator()
     col = self.layout.column()
 
-    col.label(text=settings.file_format + " Settings:")
-    if settings.file_format == 'DAE':
-        col.prop(settings, 'dae_preset_enum')
-        self.layout.prop(settings, 'apply_mods')
-    elif settings.file_format == 'ABC':
-        col.prop(settings, 'abc_preset_enum')
-        col.prop(settings, 'frame_start')
-        col.prop(settings, 'frame_end')
-    elif settings.file_format == 'USD':
-        col.prop(settings, 'usd_format')
-        col.prop(settings, 'usd_preset_enum')
-    elif settings.file_format == 'OBJ':
-        col.prop(settings, 'obj_preset_enum')
-        self.layout.prop(settings, 'apply_mods')
-    elif settings.file_format == 'PLY':
-        col.prop(settings, 'ply_ascii')
-        self.layout.prop(settings, 'apply_mods')
-    elif settings.file_format == 'STL':
-        col.prop(settings, 'stl_ascii')
-        self.layout.prop(settings, 'apply_mods')
-    elif settings.file_format == 'FBX':
-        col.prop(settings, 'fbx_preset_enum')
-        self.layout.prop(settings, 'apply_mods')
-    elif settings.file_format == 'glTF':
-        col.prop(settings, 'gltf_preset_enum')
-        self.layout.prop(settings, 'apply_mods')
-    elif settings.file_format == 'X3D':
-        col.prop(settings, 'x3d_preset_enum')
+    file_formats = [settings.file_format]
+    if settings.multi_format:
+        file_formats = []
+        for target in settings.formats:
+            if target.file_format not in file_formats:
+                file_formats.append(target.file_format)
+    use_modifiers = False
+    for file_format in file_formats:
+        export_format = export_formats.get(file_format)
+        if export_format:
+            col.label(text=file_format + " Settings:")
+            export_format.draw_settings(col, settings)
+            use_modifiers = use_modifiers or export_format.modifiers
+    if use_modifiers:
         self.layout.prop(settings, 'apply_mods')
+    row = self.layout.row(heading="LODs")
+    row.prop(settings, 'use_lods', text="")
+    sub = row.row()
+    sub.active = settings.use_lods
+    sub.prop(settings, 'lod_ratios', text="")
+    row = self.layout.row(heading="Shared Textures")
+    row.prop(settings, 'share_textures', text="")
+    sub = row.row()
+    sub.active = settings.share_textures
+    sub.prop(settings, 'texture_directory', text="")
 
     self.layout.use_property_split = False
     self.layout.separator()
@@ -136,8 +1254,19 @@ def draw_settings(self, context):
     grid = self.layout.grid_flow(columns=3, align=True)
     grid.prop(settings, 'object_types')
 
+    self.layout.separator()
+    self.layout.label(text="Post Processing:")
+    row = self.layout.row(align=True)
+    row.prop(settings, 'compressors')
+    if settings.compressors:
+        row = self.layout.row()
+        row.prop(settings, 'remove_originals')
+        row.prop(settings, 'compress_workers')
+
     self.layout.separator()
     col = self.layout.column(align=True, heading="Transform:")
+    if settings.set_location or settings.set_rotation or settings.set_scale:
+        col.prop(settings, 'transform_mode', text="")
     col.prop(settings, 'set_location')
     if settings.set_location:
         col.prop(settings, 'location', text="")  # text is redundant
@@ -148,6 +1277,21 @@ def draw_settings(self, context):
     if settings.set_scale:
         col.prop(settings, 'scale', text="")
 
+    # Summary of the last export, with its slowest items
+    if last_report:
+        self.layout.separator()
+        col = self.layout.column(align=True)
+        col.prop(settings, 'show_report', emboss=False,
+                 icon='DISCLOSURE_TRI_DOWN' if settings.show_report else 'DISCLOSURE_TRI_RIGHT',
+                 text="Last Export: " + str(last_report["files"]) + " file(s) in " +
+                 "%.2f s" % last_report["timings"]["total"])
+        if settings.show_report:
+            col.prop(settings, 'report_slowest')
+            for record in last_report["slowest"][:settings.report_slowest]:
+                row = col.row()
+                row.label(text=record["name"])
+                row.label(text="%.3f s" % record.get("total", 0.0))
+
 # Draws the button and popover dropdown button used in the
 # 3D Viewport Header or Top Bar
 def draw_popover(self, context):
@@ -208,15 +1352,607 @@ class BatchExportPreferences(AddonPreferences):
     def draw(self, context):
         self.layout.prop(self, "addon_location")
 
+# Post processing: compressing or bundling each item's exported files.
+# Each compressor is a function(filepath) returning the path of the file it wrote,
+# or None if it doesn't work on that kind of file.
+
+def compress_gzip(fp):
+    out = fp + ".gz"
+    with open(fp, 'rb') as src, gzip.open(out, 'wb') as dst:
+        shutil.copyfileobj(src, dst)
+    return out
+
+def compress_zstd(fp):
+    out = fp + ".zst"
+    with open(fp, 'rb') as src, open(out, 'wb') as dst:
+        zstandard.ZstdCompressor().copy_stream(src, dst)
+    return out
+
+# Runs a command line tool that compresses a glTF file, replacing the file
+def compress_gltf_with(fp, args):
+    if not fp.endswith((".glb", ".gltf")):
+        return None
+    root, ext = os.path.splitext(fp)
+    temp = root + ".compressing" + ext
+    subprocess.run(args(fp, temp), check=True, capture_output=True)
+    os.replace(temp, fp)
+    return fp
+
+def compress_draco(fp):
+    return compress_gltf_with(fp, lambda src, dst: [shutil.which("gltf-transform"), "draco", src, dst])
+
+def compress_meshopt(fp):
+    return compress_gltf_with(fp, lambda src, dst: [shutil.which("gltfpack"), "-i", src, "-o", dst, "-cc"])
+
+# The compressors in the order they run: the ones replacing the glTF first,
+# then the ones writing a compressed copy
+compressors = {
+    'DRACO': compress_draco,
+    'MESHOPT': compress_meshopt,
+    'GZIP': compress_gzip,
+    'ZSTD': compress_zstd,
+}
+
+# Raises ValueError if a post processing step chosen in settings can't run here
+def check_post_processing(settings):
+    if 'DRACO' in settings.compressors and not shutil.which("gltf-transform"):
+        raise ValueError("Draco compression needs gltf-transform on the PATH\n(npm install -g @gltf-transform/cli)")
+    if 'MESHOPT' in settings.compressors and not shutil.which("gltfpack"):
+        raise ValueError("meshoptimizer compression needs gltfpack on the PATH")
+    if 'ZSTD' in settings.compressors and zstandard is None:
+        raise ValueError("Zstandard compression needs the zstandard Python module installed in Blender's Python")
+    # Incremental looks for the exported files, so with them removed it would export everything every time
+    if settings.incremental and settings.remove_originals and settings.compressors:
+        raise ValueError("Remove Uncompressed can't be used with Incremental\n(it checks the uncompressed files)")
+    # Duplicates are linked to (or listed with) the uncompressed files, once they're all exported
+    if (settings.dedup != 'NONE' and settings.mode in ('OBJECTS', 'OBJECT_PARENTS')
+            and settings.remove_originals and settings.compressors):
+        raise ValueError("Remove Uncompressed can't be used with Shared Meshes\n(duplicates refer to the uncompressed files)")
+
+# Runs the chosen compressors on an item's files, then bundles them into a zip if chosen.
+# written has every file each export in files wrote (ending with that file). The zip gets
+# all of them, but only the file and its sidecars named after it (like its .mtl or .bin)
+# are compressed and removed, other files (like glTF textures) may be used by other items.
+# Runs in a thread pool while the next items export. Returns a list with each output's
+# path and size, and the size of the file it came from. A step that fails gets its error
+# in the list instead, so the other steps and files still run.
+def post_process_files(files, written, chosen, remove_originals):
+    results = []
+    own = []
+    for fp, paths in zip(files, written):
+        root = os.path.splitext(fp)[0] + "."
+        own += [path for path in paths if path == fp or path.startswith(root)]
+
+    for fp in own:
+        before = os.path.getsize(fp) if os.path.isfile(fp) else 0
+        copied = False
+        for identifier, compress in compressors.items():
+            if identifier not in chosen:
+                continue
+            try:
+                out = compress(fp)
+                if out:
+                    results.append({"file": fp, "step": identifier, "output": out,
+                                    "before": before, "after": os.path.getsize(out)})
+                    copied = copied or out != fp
+            except Exception as e:
+                results.append({"file": fp, "step": identifier, "error": str(e)})
+
+        # When zipping, the originals are removed once they're in the zip
+        if remove_originals and copied and 'ZIP' not in chosen:
+            try:
+                os.remove(fp)
+            except Exception as e:
+                results.append({"file": fp, "step": 'REMOVE', "error": str(e)})
+
+    if 'ZIP' in chosen and files:
+        out = os.path.splitext(files[0])[0] + ".zip"
+        try:
+            before = 0
+            with zipfile.ZipFile(out, 'w', zipfile.ZIP_DEFLATED) as bundle:
+                for fp, paths in zip(files, written):
+                    # Sidecars keep their place next to the file, so its paths to them still work
+                    for path in paths:
+                        bundle.write(path, os.path.relpath(path, os.path.dirname(fp)))
+                        before += os.path.getsize(path)
+            results.append({"file": files[0], "step": 'ZIP', "output": out,
+                            "before": before, "after": os.path.getsize(out)})
+        except Exception as e:
+            results.append({"file": files[0], "step": 'ZIP', "error": str(e)})
+            return results  # Keep the originals, they aren't in a zip
+        if remove_originals:
+            for fp in own:
+                try:
+                    os.remove(fp)
+                except Exception as e:
+                    results.append({"file": fp, "step": 'REMOVE', "error": str(e)})
+    return results
+
+# Returns the (vertices, faces, triangles) an item will export, after modifiers
+# if they're applied. Objects without geometry count as 0.
+def item_geometry_counts(item_objects, depsgraph, apply_mods):
+    vertices = faces = triangles = 0
+    for obj in item_objects:
+        if obj.type not in ('MESH', 'CURVE', 'SURFACE', 'META', 'FONT'):
+            continue
+        if obj.type == 'MESH' and not apply_mods:
+            mesh = obj.data
+            mesh.calc_loop_triangles()
+            vertices += len(mesh.vertices)
+            faces += len(mesh.polygons)
+            triangles += len(mesh.loop_triangles)
+            continue
+        obj_eval = obj.evaluated_get(depsgraph)
+        mesh = obj_eval.to_mesh()
+        if mesh:
+            mesh.calc_loop_triangles()
+            vertices += len(mesh.vertices)
+            faces += len(mesh.polygons)
+            triangles += len(mesh.loop_triangles)
+        obj_eval.to_mesh_clear()
+    return vertices, faces, triangles
+
+# Returns {file path: [item names]} for every file more than one item would be
+# exported to (because their names are the same after bpy.path.clean_name),
+# which would otherwise silently overwrite each other
+def find_collisions(settings, items, export_calls):
+    paths = {}
+    for itemname, item_objects in items:
+        for directory, export_call in export_calls:
+            fp = item_filepath(settings, directory, itemname, export_call.extension)
+            paths.setdefault(os.path.normcase(fp), []).append(itemname)
+    return {fp: names for fp, names in paths.items() if len(names) > 1}
+
+# Name of the file a Plan writes (when a report is chosen)
+plan_name = "batch_export_plan.json"
+
+# Name of the file listing the duplicate items that weren't exported, when
+# Shared Meshes is set to Instance List
+instances_name = "batch_export_instances.json"
+
+# Returns a key that's the same for items that would export the same geometry:
+# for each of the item's objects, its mesh datablock (or with Compare Geometry on, a hash
+# of its geometry after modifiers), its modifiers if they're applied, its materials,
+# and for children in the item, their transform relative to their parent. With Hardlink
+# Duplicates the files are the same too, so it also has the parts of the other objects'
+# transforms that aren't set by the transform settings (Instance List lists those).
+def instance_key(settings, item_objects, depsgraph):
+    key = []
+    in_item = {obj.as_pointer() for obj in item_objects}
+    for obj in item_objects:
+        h = hashlib.sha1(obj.type.encode())
+        if settings.dedup_geometry and obj.type in ('MESH', 'CURVE', 'SURFACE', 'META', 'FONT'):
+            obj_eval = obj.evaluated_get(depsgraph)
+            mesh = obj_eval.to_mesh()
+            if mesh:
+                hash_mesh(mesh, h)
+            obj_eval.to_mesh_clear()
+        else:
+            h.update(str(obj.data.as_pointer() if obj.data else 0).encode())
+            if settings.apply_mods:
+                for mod in obj.modifiers:
+                    hash_rna(mod, h)
+        for slot in obj.material_slots:
+            h.update((slot.material.name if slot.material else "").encode())
+        if obj.parent and obj.parent.as_pointer() in in_item:
+            h.update(repr([tuple(row) for row in obj.matrix_local]).encode())
+        elif settings.dedup == 'LINK':
+            h.update(repr(unset_transform(obj, settings)).encode())
+        key.append(h.hexdigest())
+    return tuple(key)
+
+# Returns the parts of obj's exported transform that set_transform_overrides doesn't set,
+# including the transform of its parent if it has one
+def unset_transform(obj, settings):
+    overridden = settings.mode != "OBJECT_PARENTS" or not obj.parent
+    transform = []
+    if not (overridden and settings.set_location):
+        transform.append(tuple(obj.location))
+    if not (overridden and settings.set_rotation):
+        if obj.rotation_mode == 'QUATERNION':
+            transform.append(tuple(obj.rotation_quaternion))
+        elif obj.rotation_mode == 'AXIS_ANGLE':
+            transform.append(tuple(obj.rotation_axis_angle))
+        else:
+            transform.append((obj.rotation_mode,) + tuple(obj.rotation_euler))
+    if not (overridden and settings.set_scale):
+        transform.append(tuple(obj.scale))
+    if obj.parent:
+        matrix = obj.parent.matrix_world @ obj.matrix_parent_inverse
+        transform.append([tuple(row) for row in matrix])
+    return transform
+
+# Groups items that would export the same geometry. Returns the (items to export,
+# {item name: [(duplicate item name, duplicate item objects)]}) where only the first
+# item of each group is exported.
+def group_instances(settings, items, depsgraph):
+    sources = {}
+    unique = []
+    duplicates = {}
+    for itemname, item_objects in items:
+        key = instance_key(settings, item_objects, depsgraph)
+        if key in sources:
+            duplicates.setdefault(sources[key], []).append((itemname, item_objects))
+            continue
+        sources[key] = itemname
+        unique.append((itemname, item_objects))
+    return unique, duplicates
+
+# Hardlinks dst to src (replacing dst), or copies it if the file system can't link
+def link_file(src, dst):
+    if os.path.exists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+# Shared Textures: the images used by the exported items are copied once to a shared
+# folder, and the exporters are pointed at the copies instead of embedding or copying
+# the images into every file.
+
+# Returns the images used by a material's nodes (and the node groups in them)
+def material_images(material):
+    images = []
+    seen = set()
+    stack = [material.node_tree] if material.node_tree else []
+    while stack:
+        tree = stack.pop()
+        if tree.as_pointer() in seen:
+            continue
+        seen.add(tree.as_pointer())
+        for node in tree.nodes:
+            if getattr(node, "image", None):
+                images.append(node.image)
+            elif node.type == 'GROUP' and node.node_tree:
+                stack.append(node.node_tree)
+    return images
+
+# Returns the images used by the materials of item_objects. cache is a
+# {material pointer: [images]} shared by every item of a run, so each material
+# is only searched once.
+def item_images(item_objects, cache):
+    images = {}
+    for obj in item_objects:
+        for slot in obj.material_slots:
+            if not slot.material:
+                continue
+            key = slot.material.as_pointer()
+            if key not in cache:
+                cache[key] = material_images(slot.material)
+            for image in cache[key]:
+                images[image.as_pointer()] = image
+    return list(images.values())
+
+# Returns the (file path, packed data, extension) an image's pixels come from,
+# or None if it has no file to share (generated, rendered, or its file is missing)
+def image_source(image):
+    if image.packed_file:
+        extension = os.path.splitext(image.filepath)[1] or "." + image.file_format.lower()
+        return None, bytes(image.packed_file.data), extension
+    if image.source != 'FILE':
+        return None
+    path = bpy.path.abspath(image.filepath, library=image.library)
+    if not os.path.isfile(path):
+        return None
+    return path, None, os.path.splitext(path)[1]
+
+# Returns the SHA-1 of a file (or of data, if it isn't None). Runs in a thread pool.
+def hash_source(path, data=None):
+    h = hashlib.sha1()
+    if data is not None:
+        h.update(data)
+        return h.hexdigest()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+# Copies a texture (or writes its packed data) to dst, unless dst already has the
+# same content (from an earlier run). Returns the bytes written. Runs in a thread pool.
+def copy_texture(path, data, digest, dst):
+    size = len(data) if data is not None else os.path.getsize(path)
+    if os.path.isfile(dst) and os.path.getsize(dst) == size and hash_source(dst) == digest:
+        return 0
+    temp = dst + ".partial"
+    if data is not None:
+        with open(temp, 'wb') as file:
+            file.write(data)
+    else:
+        shutil.copyfile(path, temp)
+    os.replace(temp, dst)
+    return size
+
+# Copies the images to texture_dir, each content only once (images with the same pixels
+# share a copy), hashing and copying in a thread pool. Returns the ({image name: path of
+# its copy}, stats of what was done). Linked images can't be pointed at their copies, and
+# images without a file are left as they are.
+def share_textures(images, texture_dir):
+    sources = []
+    for image in images:
+        source = image_source(image) if not image.library else None
+        if source:
+            sources.append((image, source))
+        else:
+            print("texture not shared: ", image.name)
+    if not sources:
+        return {}, {"images": len(images), "unique": 0, "copied": 0, "bytes": 0}
+
+    os.makedirs(texture_dir, exist_ok=True)
+    with ThreadPoolExecutor() as pool:
+        digests = list(pool.map(lambda source: hash_source(source[0], source[1]),
+                                [source for image, source in sources]))
+        copies = {}  # digest: path of the copy
+        taken = {}  # copy file name: digest
+        copy_jobs = []
+        paths = {}
+        for (image, (path, data, extension)), digest in zip(sources, digests):
+            if digest not in copies:
+                name = bpy.path.clean_name(os.path.splitext(image.name)[0]) + extension
+                if taken.setdefault(os.path.normcase(name), digest) != digest:
+                    # Another image with different pixels has this name
+                    name = os.path.splitext(name)[0] + "_" + digest[:8] + extension
+                copies[digest] = os.path.join(texture_dir, name)
+                copy_jobs.append(pool.submit(copy_texture, path, data, digest, copies[digest]))
+            paths[image.name] = copies[digest]
+        written = [job.result() for job in copy_jobs]
+    return paths, {"images": len(images), "unique": len(copies),
+                   "copied": sum(1 for size in written if size), "bytes": sum(written)}
+
+# Points images at their shared copies (filepath_raw changes the path without
+# reloading the image) as they're referred to from files written in write_dir that end
+# up in final_dir. These differ with Atomic Writes, which exports into a hidden folder,
+# so the relative paths the exporter writes are right once the file is moved into place.
+# originals gets the path each image had before, to put back with restore_image_paths.
+def point_images(images, shared_paths, write_dir, final_dir, originals):
+    for image in images:
+        shared = shared_paths.get(image.name)
+        if shared is None:
+            continue
+        originals.setdefault(image.name, image.filepath_raw)
+        image.filepath_raw = os.path.join(write_dir, os.path.relpath(shared, final_dir))
+
+def restore_image_paths(originals):
+    for name, path in originals.items():
+        image = bpy.data.images.get(name)
+        if image:
+            image.filepath_raw = path
+    originals.clear()
+
+# Returns how much memory this process is using (its resident set size) in bytes,
+# or 0 if it can't be read (then the Memory Limit isn't checked)
+def process_memory():
+    if sys.platform == 'win32':
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD)] + [
+                (name, ctypes.c_size_t) for name in (
+                    "PeakWorkingSetSize", "WorkingSetSize", "QuotaPeakPagedPoolUsage",
+                    "QuotaPagedPoolUsage", "QuotaPeakNonPagedPoolUsage",
+                    "QuotaNonPagedPoolUsage", "PagefileUsage", "PeakPagefileUsage")]
+
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        kernel32 = ctypes.windll.kernel32
+        kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+        if ctypes.windll.psapi.GetProcessMemoryInfo(
+                wintypes.HANDLE(kernel32.GetCurrentProcess()), ctypes.byref(counters), counters.cb):
+            return counters.WorkingSetSize
+        return 0
+    if sys.platform == 'darwin':
+        # getrusage only has the peak, which never goes down, so ask mach for the current use
+        import ctypes
+        import ctypes.util
+
+        class mach_task_basic_info(ctypes.Structure):
+            _fields_ = [("virtual_size", ctypes.c_uint64), ("resident_size", ctypes.c_uint64),
+                        ("resident_size_max", ctypes.c_uint64), ("user_time", ctypes.c_int32 * 2),
+                        ("system_time", ctypes.c_int32 * 2), ("policy", ctypes.c_int32),
+                        ("suspend_count", ctypes.c_int32)]
+
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c"))
+            info = mach_task_basic_info()
+            count = ctypes.c_uint32(ctypes.sizeof(info) // 4)
+            MACH_TASK_BASIC_INFO = 20
+            if libc.task_info(ctypes.c_uint32.in_dll(libc, "mach_task_self_"), MACH_TASK_BASIC_INFO,
+                              ctypes.byref(info), ctypes.byref(count)) == 0:
+                return info.resident_size
+        except (OSError, AttributeError, ValueError):
+            pass
+        return 0
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+# Linux keeps the peak memory of a process in VmHWM, which can be reset after each item
+# so its report gets the most it used while exporting. Returns False if it can't be reset.
+def reset_peak_memory():
+    try:
+        with open("/proc/self/clear_refs", 'w') as file:
+            file.write("5")
+        return True
+    except OSError:
+        return False
+
+# Returns the peak memory use since reset_peak_memory in bytes, or 0 if it can't be read
+def peak_memory():
+    try:
+        with open("/proc/self/status") as file:
+            for line in file:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return 0
+
+# The bpy.data collections exporters make temporary datablocks in
+# (meshes with modifiers applied, converted curves, baked materials and images...)
+temporary_data_types = ('meshes', 'curves', 'materials', 'images', 'textures',
+                        'node_groups', 'actions', 'armatures')
+
+# Returns the pointers of every datablock in those collections, taken before exporting,
+# so cleaning up only ever removes datablocks made during the export
+def snapshot_data():
+    return {data.as_pointer() for data_type in temporary_data_types
+            for data in getattr(bpy.data, data_type)}
+
+# Removes the datablocks made since the snapshot that nothing uses anymore (left behind
+# by exporters), and frees Python's unreachable objects. Returns how many were removed.
+def free_export_data(snapshot):
+    orphans = [data for data_type in temporary_data_types for data in getattr(bpy.data, data_type)
+               if data.users == 0 and data.as_pointer() not in snapshot]
+    if orphans:
+        bpy.data.batch_remove(orphans)
+    gc.collect()
+    return len(orphans)
+
+# How long the Show Progress export spends exporting before letting Blender
+# update the UI (in seconds)
+modal_time_slice = 0.05
+
 # Operator called when pressing the batch export button.
 class EXPORT_MESH_OT_batch(Operator):
     """Export many objects to seperate files all at once"""
     bl_idname = "export_mesh.batch"
     bl_label = "Batch Export"
     file_count = 0
+    skipped_count = 0
+    run_start = 0.0
+    timings = {}
+    item_reports = []
+    export_calls = []
+    staging_scene = None
+    base_dir = ""
+    items = []
+    exported = []
+    selection = []
+    obj_active = None
+    mode = ''
+    loop_start = 0.0
+    done_count = 0
+    post_pool = None
+    post_futures = []
+    duplicates = {}
+    instance_count = 0
+    linked_count = 0
+    selected = []
+    manifest = {}
+    fingerprints = {}
+    lock_path = None
+    data_snapshot = None
+    since_cleanup = 0
+    peak_memory = 0
+    can_split = False
+    overflow = []
+    texture_paths = {}
+    texture_stats = {}
+    material_images = {}
+    image_originals = {}
+
+    shard: StringProperty(
+        description="Used by parallel export workers: a file listing the items this worker should export",
+        options={'HIDDEN', 'SKIP_SAVE'},
+    )
+    dry_run: BoolProperty(
+        name="Plan",
+        description="Only report which files would be exported, without exporting",
+        options={'SKIP_SAVE'},
+    )
+
+    @classmethod
+    def description(cls, context, properties):
+        if properties.dry_run:
+            return "List the files a batch export would write, their vertex and face counts,\nestimated sizes and any name collisions, without exporting (see console)"
+        return cls.__doc__
 
     def execute(self, context):
+        result = self.start_export(context)
+        if result:
+            return result
+        try:
+            for _ in self.export_items(context):
+                pass
+        except Exception as e:
+            # Still put the selection, mode and image paths back if an exporter fails
+            self.finish_export(context, cancelled=True)
+            self.report({'ERROR'}, "Batch export failed: " + str(e))
+            return {'CANCELLED'}
+        return self.finish_export(context)
+
+    # When Show Progress is on, exports a few items at a time from a timer instead
+    # of all at once, so Blender can keep drawing the progress and Esc can cancel
+    def invoke(self, context, event):
+        if not context.scene.batch_export.use_modal or not context.window:
+            return self.execute(context)
+        result = self.start_export(context)
+        if result:
+            return result
+
+        self.item_iterator = self.export_items(context)
+        self.done_count = 0
+        wm = context.window_manager
+        wm.progress_begin(0, len(self.items))
+        self.timer = wm.event_timer_add(0.01, window=context.window)
+        wm.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event):
+        if event.type == 'ESC':
+            return self.finish_modal(context, cancelled=True)
+        if event.type != 'TIMER':
+            # Let the view be moved around, but don't allow editing the scene while exporting
+            if event.type in {'MOUSEMOVE', 'INBETWEEN_MOUSEMOVE', 'MIDDLEMOUSE', 'WHEELUPMOUSE',
+                              'WHEELDOWNMOUSE', 'TRACKPADPAN', 'TRACKPADZOOM'}:
+                return {'PASS_THROUGH'}
+            return {'RUNNING_MODAL'}
+
+        # Export items until this time slice is used up (always at least one)
+        slice_end = time.perf_counter() + modal_time_slice
+        try:
+            for _ in self.item_iterator:
+                self.done_count += 1
+                if time.perf_counter() >= slice_end:
+                    break
+            else:
+                return self.finish_modal(context)
+        except Exception as e:
+            # Still put the selection and mode back if an exporter fails
+            self.finish_modal(context, cancelled=True)
+            self.report({'ERROR'}, "Batch export failed: " + str(e))
+            return {'CANCELLED'}
+
+        elapsed = time.perf_counter() - self.loop_start
+        rate = self.done_count / elapsed if elapsed else 0.0
+        remaining = (len(self.items) - self.done_count) / rate if rate else 0.0
+        context.window_manager.progress_update(self.done_count)
+        context.workspace.status_text_set(
+            "Batch Export: " + str(self.done_count) + "/" + str(len(self.items)) +
+            " items, %.1f items/s, %d:%02d left (Esc to cancel)" % (rate, remaining // 60, remaining % 60))
+        return {'RUNNING_MODAL'}
+
+    def finish_modal(self, context, cancelled=False):
+        wm = context.window_manager
+        wm.event_timer_remove(self.timer)
+        wm.progress_end()
+        context.workspace.status_text_set(None)
+        if cancelled:
+            self.item_iterator.close()
+        return self.finish_export(context, cancelled)
+
+    # Checks the settings, prepares the exporters and plans the items to export.
+    # Returns the operator's result if the export is already over (because of an error,
+    # nothing to export, or it was done by parallel workers), None if the items are
+    # ready for export_items.
+    def start_export(self, context):
         settings = context.scene.batch_export
+        # Running as a worker of a parallel export, only export this worker's share
+        if self.shard:
+            return self.execute_shard(context)
 
         base_dir = settings.directory
         if not bpy.path.abspath('//'):  # Then the blend file hasn't been saved
@@ -224,199 +1960,913 @@ class EXPORT_MESH_OT_batch(Operator):
             if base_dir != bpy.path.abspath(base_dir):
                 self.report(
                     {'ERROR'}, "Save .blend file somewhere before exporting to relative directory\n(or use an absolute directory)")
-                return {'FINISHED'}
+                return {'CANCELLED'}
         base_dir = bpy.path.abspath(base_dir)  # convert to absolute path
         if not os.path.isdir(base_dir):
             self.report({'ERROR'}, "Export directory doesn't exist")
-            return {'FINISHED'}
+            return {'CANCELLED'}
+        self.base_dir = base_dir
 
         self.file_count = 0
+        self.run_start = time.perf_counter()
+        self.timings = {}
+        self.item_reports = []
+        # Resolve the operators, presets and options once for the whole batch rather than once per file
+        try:
+            self.export_calls = prepare_export_calls(settings, base_dir, create_dirs=not self.dry_run)
+            check_post_processing(settings)
+        except ValueError as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+        self.timings["preset"] = time.perf_counter() - self.run_start
+
+        # Lock before reading the manifest, so two incremental runs can't both use it
+        self.lock_path = None
+        if settings.lock_directory and not self.dry_run:
+            try:
+                self.lock_path = acquire_directory_lock(base_dir)
+            except ValueError as e:
+                self.report({'ERROR'}, str(e))
+                return {'CANCELLED'}
+
+        # Anything going wrong from here on still has to let go of the lock
+        try:
+            return self.start_items(context, settings, base_dir)
+        except Exception:
+            self.release_lock()
+            raise
+
+    # The rest of start_export, once the directory is locked
+    def start_items(self, context, settings, base_dir):
+        if self.lock_path:
+            for directory in {directory for directory, export_call in self.export_calls}:
+                remove_partial_exports(directory)
+
+        start = time.perf_counter()
+        try:
+            items = plan_export(context, settings)
+        except ValueError as e:
+            self.release_lock()
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+        self.timings["plan"] = time.perf_counter() - start
+        self.skipped_count = 0
+        self.manifest = {}
+        self.fingerprints = {}
+        if settings.incremental:
+            start = time.perf_counter()
+            self.manifest = load_manifest(base_dir)
+            items, self.fingerprints, self.skipped_count = filter_unchanged_items(
+                settings, base_dir, items, self.export_calls, self.manifest)
+            self.timings["fingerprint"] = time.perf_counter() - start
+            if not items:
+                self.release_lock()
+                self.report({'INFO'}, "Nothing changed, skipped " +
+                            str(self.skipped_count) + " unchanged file(s)")
+                return {'FINISHED'}
 
+        self.duplicates = {}
+        if settings.dedup != 'NONE' and settings.mode in ('OBJECTS', 'OBJECT_PARENTS'):
+            start = time.perf_counter()
+            items, self.duplicates = group_instances(
+                settings, items, context.evaluated_depsgraph_get())
+            self.timings["dedup"] = time.perf_counter() - start
+
+        collisions = find_collisions(settings, items, self.export_calls)
+        if self.dry_run:
+            return self.report_plan(context, items, collisions)
+        if collisions:
+            for fp, names in collisions.items():
+                print("name collision: ", fp, "would be written by", ", ".join(names))
+            self.report({'WARNING'}, str(len(collisions)) +
+                        " file(s) are written by more than one item (see console)")
+
+        self.start_shared_textures(settings, base_dir, items)
+
+        # Frame range chunks are exported by workers, like a parallel export
+        if settings.parallel or self.chunked_calls(settings):
+            return self.execute_parallel(context, base_dir, items)
+
+        self.items = items
         view_layer = context.view_layer
-        obj_active = view_layer.objects.active
-        selection = context.selected_objects
-        objects = view_layer.objects.values()
-        if settings.limit == 'SELECTED':
-            objects = selection
-
-        mode = ''
-        if obj_active:
-            mode = obj_active.mode
-            bpy.ops.object.mode_set(mode='OBJECT')  # Only works in Object mode
+        self.obj_active = view_layer.objects.active
+        self.selection = context.selected_objects
 
-        if settings.mode == 'OBJECTS':
-            for obj in objects:
-                if not obj.type in settings.object_types:
-                    continue
-                bpy.ops.object.select_all(action='DESELECT')
-                obj.select_set(True)
-                self.export_selection(obj.name, context, base_dir)
+        self.mode = ''
+        if self.obj_active:
+            self.mode = self.obj_active.mode
+            bpy.ops.object.mode_set(mode='OBJECT')  # Only works in Object mode
 
-        elif settings.mode == 'OBJECT_PARENTS':
-            for obj in objects:
-                if obj.parent:  # if it has a parent, skip it for now, it'll be exported when we get to its parent
-                    continue
-                bpy.ops.object.select_all(action='DESELECT')
-                if obj.type in settings.object_types:
-                    obj.select_set(True)
-                self.select_children_recursive(obj, context,)
-                if context.selected_objects:
-                    self.export_selection(obj.name, context, base_dir)
-
-        elif settings.mode == 'COLLECTIONS':
-            for col in bpy.data.collections.values():
-                bpy.ops.object.select_all(action='DESELECT')
-                for obj in col.objects:
-                    if not obj.type in settings.object_types:
-                        continue
-                    if not obj in objects:
-                        continue
-                    obj.select_set(True)
-                if context.selected_objects:
-                    self.export_selection(col.name, context, base_dir)
+        # Only the objects that were selected need deselecting, after that
+        # select_only keeps track of which objects it needs to deselect
+        self.selected = self.selection
+        self.exported = []
+        # Workers export the saved file, so the rest of the items can only go to workers
+        # when going over the Memory Limit if what's saved is what's being exported
+        self.can_split = bool(bpy.data.filepath) and not bpy.data.is_dirty
+        self.overflow = []
+        self.start_memory_tracking(settings)
+        self.start_post_processing(settings)
+        self.loop_start = time.perf_counter()
+        return None
+
+    # Exports the planned items one at a time, yielding after each one.
+    # If Blender is still over the Memory Limit after cleaning up, the rest of
+    # the items are left in self.overflow for workers to export.
+    def export_items(self, context):
+        settings = context.scene.batch_export
+        for index, (itemname, item_objects) in enumerate(self.items):
+            record = {"name": itemname}
+            select_start = time.perf_counter()
+            self.select_only(item_objects)
+            record["select"] = time.perf_counter() - select_start
+            files = self.export_selection(
+                itemname, item_objects, context, self.base_dir, record)
+            self.post_process(settings, record, files)
+            self.exported += files
+            if self.check_memory(settings, record) and self.can_split and index + 1 < len(self.items):
+                self.overflow = self.items[index + 1:]
+                print("Over the memory limit, exporting the other " +
+                      str(len(self.overflow)) + " item(s) with workers")
+                return
+            yield
+
+    # Exports the items left when going over the Memory Limit with a fresh background worker.
+    # Only one, since each worker loads the whole scene again while this Blender is still
+    # near the limit (it's replaced by another one whenever it goes over the limit itself).
+    def export_overflow(self, context):
+        units = [{"name": itemname, "objects": [obj.name for obj in item_objects]}
+                 for itemname, item_objects in self.overflow]
+        self.overflow = []
+        start = time.perf_counter()
+        exported, failed, worker_count = self.run_units(context, units, worker_count=1)
+        self.timings["overflow"] = time.perf_counter() - start
+        self.exported += exported
+        self.file_count += len(exported)
+        for failure in failed:
+            print("failed: ", failure["name"], failure["error"])
+        return failed
+
+    # Takes the snapshot of the datablocks that exist before exporting, if anything will clean up
+    def start_memory_tracking(self, settings):
+        self.data_snapshot = None
+        if settings.memory_limit or settings.cleanup_interval:
+            self.data_snapshot = snapshot_data()
+        self.since_cleanup = 0
+        self.peak_memory = process_memory()
+        self.item_peaks = reset_peak_memory()
+
+    # Adds the memory used by an item to its report (its peak where that can be
+    # reset for each item, otherwise what's used after it), and frees what the exporters
+    # left behind every Clean Up Every items, or when over the Memory Limit.
+    # Returns True if still over the Memory Limit after cleaning up (freed memory
+    # isn't always given back to the system, so the process has to be replaced).
+    def check_memory(self, settings, record):
+        self.since_cleanup += 1
+        memory = process_memory()
+        record["memory"] = max(memory, peak_memory() if self.item_peaks else 0)
+        limit = settings.memory_limit * 1048576
+        over = limit and memory > limit
+        if over or (settings.cleanup_interval and self.since_cleanup >= settings.cleanup_interval):
+            start = time.perf_counter()
+            record["freed"] = free_export_data(self.data_snapshot)
+            record["cleanup"] = time.perf_counter() - start
+            self.since_cleanup = 0
+            memory = process_memory()
+            over = limit and memory > limit
+        self.peak_memory = max(self.peak_memory, record["memory"])
+        if self.item_peaks:
+            reset_peak_memory()
+        return bool(over)
+
+    # Puts everything back how it was before exporting (selection, active object
+    # and mode), and reports how the export went
+    def finish_export(self, context, cancelled=False):
+        settings = context.scene.batch_export
+        base_dir = self.base_dir
+        self.remove_staging_scene()
+        restore_image_paths(self.image_originals)
+        self.timings["export"] = time.perf_counter() - self.loop_start
+        self.finish_post_processing()
+        hash_index_entries(base_dir, self.item_reports)
+        failed = []
+        if self.overflow and not cancelled:
+            failed = self.export_overflow(context)
+        linked = self.write_instances(settings, base_dir)
+        self.linked_count = len(linked)
+        self.update_manifest(settings, base_dir, self.exported + linked)
 
         # Return selection to how it was
-        bpy.ops.object.select_all(action='DESELECT')
-        for obj in selection:
-            obj.select_set(True)
-        view_layer.objects.active = obj_active
+        start = time.perf_counter()
+        self.select_only(self.selection)
+        context.view_layer.objects.active = self.obj_active
 
         # Return to whatever mode the user was in
-        if obj_active:
-            bpy.ops.object.mode_set(mode=mode)
-
+        if self.obj_active:
+            bpy.ops.object.mode_set(mode=self.mode)
+        self.timings["restore"] = time.perf_counter() - start
+        self.finish_report(settings, base_dir)
+        self.release_lock()
+
+        if cancelled:
+            self.report({'WARNING'}, "Cancelled, exported " +
+                        str(self.file_count) + " file(s) before cancelling")
+            return {'CANCELLED'}
+        if failed:
+            self.report({'ERROR'}, "Exported " + str(self.file_count) + " file(s), " +
+                        str(len(failed)) + " failed (see console)")
+            return {'CANCELLED'}
         if self.file_count == 0:
             self.report({'ERROR'}, "NOTHING TO EXPORT")
-        else:
-            self.report({'INFO'}, "Exported " +
-                        str(self.file_count) + " file(s)")
+            return {'CANCELLED'}
+        self.report({'INFO'}, "Exported " +
+                    str(self.file_count) + " file(s)" + self.summary_message())
+        return {'FINISHED'}
+
+    # Copies the textures of every item to the shared texture folder, before exporting
+    def start_shared_textures(self, settings, base_dir, items):
+        self.texture_paths = {}
+        self.texture_stats = {}
+        self.material_images = {}
+        self.image_originals = {}
+        if not settings.share_textures or not any(
+                export_call.export_format.texture_options for directory, export_call in self.export_calls):
+            return
+        start = time.perf_counter()
+        images = {}
+        for itemname, item_objects in items:
+            for image in item_images(item_objects, self.material_images):
+                images[image.as_pointer()] = image
+        texture_dir = os.path.join(base_dir, bpy.path.clean_name(settings.texture_directory))
+        self.texture_paths, self.texture_stats = share_textures(list(images.values()), texture_dir)
+        self.timings["textures"] = time.perf_counter() - start
+
+    def release_lock(self):
+        if self.lock_path:
+            release_directory_lock(self.lock_path)
+            self.lock_path = None
+
+    # Starts the thread pool post processing runs in, if any is chosen
+    def start_post_processing(self, settings):
+        self.post_pool = None
+        self.post_futures = []
+        if settings.compressors:
+            self.post_pool = ThreadPoolExecutor(
+                max_workers=settings.compress_workers or os.cpu_count() or 1)
+
+    # Queues post processing of an item's files, to run while the next items export
+    def post_process(self, settings, record, files):
+        written = record.pop("written", [[fp] for fp in files])
+        if self.post_pool:
+            future = self.post_pool.submit(post_process_files, files, written,
+                                           set(settings.compressors), settings.remove_originals)
+            self.post_futures.append((record, future))
+
+    # Waits for post processing to finish and adds its results to the item reports
+    def finish_post_processing(self):
+        if not self.post_pool:
+            return
+        start = time.perf_counter()
+        for record, future in self.post_futures:
+            record["post_process"] = future.result()
+            for result in record["post_process"]:
+                if "error" in result:
+                    print("post processing failed: ", result["file"], result["step"], result["error"])
+        self.post_pool.shutdown()
+        self.post_pool = None
+        self.timings["post_process_wait"] = time.perf_counter() - start
+
+    # Remembers the fingerprints of the files that were exported, for the next incremental export
+    def update_manifest(self, settings, base_dir, exported):
+        if not settings.incremental:
+            return
+        for fp in exported:
+            key = os.path.relpath(fp, base_dir)
+            if key in self.fingerprints:
+                self.manifest[key] = self.fingerprints[key]
+        save_manifest(base_dir, self.manifest)
+
+    # Saves the timings of this run for the summary in the UI, and writes
+    # them to a report file next to the exported files if that's turned on
+    def finish_report(self, settings, base_dir):
+        global last_report
+        # The index entries travel with the item reports (from workers too), but aren't part of the report
+        index = [entry for record in self.item_reports for entry in record.pop("index", [])]
+        if settings.index_format != 'NONE':
+            write_index(base_dir, settings.index_format, index)
+        self.timings["total"] = time.perf_counter() - self.run_start
+        report = {
+            "files": self.file_count,
+            "skipped": self.skipped_count,
+            "bytes": sum(record.get("bytes", 0) for record in self.item_reports),
+            "timings": self.timings,
+            "peak_memory": max([self.peak_memory] + [record.get("memory", 0) for record in self.item_reports]),
+            "textures": self.texture_stats,
+            "items": self.item_reports,
+        }
+        # Sorted once here rather than every time the UI is drawn
+        last_report = dict(report, slowest=sorted(
+            self.item_reports, key=lambda record: record.get("total", 0.0), reverse=True))
+        if settings.report_format != 'NONE':
+            write_report(base_dir, settings.report_format, report)
+
+    # Reports what an export would do without exporting anything: the files it would
+    # write with each item's vertex and face counts and estimated size, and any files
+    # more than one item would write to. Printed to the console, and written to
+    # batch_export_plan.json when a report is chosen.
+    def report_plan(self, context, items, collisions):
+        settings = context.scene.batch_export
+        depsgraph = context.evaluated_depsgraph_get()
+        plan = []
+        total_bytes = 0
+        for itemname, item_objects in items:
+            vertices, faces, triangles = item_geometry_counts(
+                item_objects, depsgraph, settings.apply_mods)
+            for directory, export_call in self.export_calls:
+                per_vertex, per_triangle = export_call.export_format.estimate
+                ratio = export_call.lod[1] if export_call.lod else 1.0
+                estimate = int((vertices * per_vertex + triangles * per_triangle) * ratio)
+                total_bytes += estimate
+                plan.append({
+                    "name": itemname,
+                    "file": item_filepath(settings, directory, itemname, export_call.extension),
+                    "objects": [obj.name for obj in item_objects],
+                    "vertices": vertices,
+                    "faces": faces,
+                    "triangles": triangles,
+                    "estimated_bytes": estimate,
+                })
+
+        for entry in plan:
+            print("plan: %s  (%d objects, %d vertices, %d faces, ~%.1f KB)" % (
+                entry["file"], len(entry["objects"]), entry["vertices"], entry["faces"],
+                entry["estimated_bytes"] / 1024))
+        for fp, names in collisions.items():
+            print("name collision: ", fp, "would be written by", ", ".join(names))
+        for source, duplicates in self.duplicates.items():
+            print("shared mesh: ", source, "also used by", ", ".join(name for name, objs in duplicates))
+        if settings.report_format != 'NONE':
+            with open(os.path.join(self.base_dir, plan_name), 'w') as file:
+                json.dump({"files": plan, "estimated_bytes": total_bytes,
+                           "collisions": collisions, "skipped": self.skipped_count}, file, indent=1)
+
+        message = "Plan: " + str(len(plan)) + " file(s), about %.1f MB" % (total_bytes / 1048576)
+        if collisions:
+            message += ", " + str(len(collisions)) + " name collision(s)"
+        self.report({'WARNING'} if collisions else {'INFO'},
+                    message + self.summary_message() + " (see console)")
+        return {'FINISHED'}
 
+    # Links or lists the duplicate items of each exported item, depending on the
+    # Shared Meshes setting. Returns the paths of the files linked.
+    def write_instances(self, settings, base_dir):
+        self.instance_count = 0
+        if not self.duplicates:
+            return []
+        linked = []
+        instances = []
+        for source, duplicates in self.duplicates.items():
+            for directory, export_call in self.export_calls:
+                src = item_filepath(settings, directory, source, export_call.extension)
+                if not os.path.isfile(src):  # Failed or the export was cancelled before it
+                    continue
+                for itemname, item_objects in duplicates:
+                    if settings.dedup == 'LINK':
+                        dst = item_filepath(settings, directory, itemname, export_call.extension)
+                        link_file(src, dst)
+                        linked.append(dst)
+                    else:
+                        instances.append({
+                            "name": itemname,
+                            "file": os.path.relpath(src, base_dir),
+                            "objects": [{"name": obj.name,
+                                         "matrix_world": [list(row) for row in obj.matrix_world]}
+                                        for obj in item_objects],
+                        })
+                    self.instance_count += 1
+        if settings.dedup == 'MANIFEST':
+            with open(os.path.join(base_dir, instances_name), 'w') as file:
+                json.dump({"version": 1, "instances": instances}, file, indent=1)
+        for fp in linked:
+            print("linked: ", fp)
+        return linked
+
+    def summary_message(self):
+        message = ""
+        if self.texture_stats.get("unique"):
+            message += ", " + str(self.texture_stats["unique"]) + " shared texture(s)"
+        if self.skipped_count:
+            message += ", skipped " + str(self.skipped_count) + " unchanged"
+        if self.instance_count:
+            message += ", " + str(self.instance_count) + " duplicate(s) " + (
+                "linked" if self.linked_count else "listed in " + instances_name)
+        return message
+
+    # Returns the indices of the export calls whose frame range is split into chunks
+    def chunked_calls(self, settings):
+        if not settings.frame_chunk:
+            return []
+        return [index for index, (directory, export_call) in enumerate(self.export_calls)
+                if export_call.export_format.frame_range]
+
+    # Returns what the workers export: one unit for each item with the formats that aren't
+    # split into chunks, and one for each chunk of frames of each item and chunked format
+    def plan_units(self, settings, scene, items, chunked):
+        units = []
+        for itemname, item_objects in items:
+            objects = [obj.name for obj in item_objects]
+            if len(chunked) < len(self.export_calls):
+                units.append({"name": itemname, "objects": objects})
+            for index in chunked:
+                export_format = self.export_calls[index][1].export_format
+                first, last = export_format.frame_range(settings, scene)
+                for frames in frame_chunks(first, last, settings.frame_chunk):
+                    units.append({"name": itemname, "objects": objects,
+                                  "call": index, "frames": frames})
+        return units
+
+    # Joins the chunk files of each item into one file for each chunked format, with the
+    # format's stitch function, and removes the chunks. Chunks that can't be stitched
+    # are kept, and listed in a name_chunks.json next to them. The time stitching each
+    # item took is added to the report. Returns exported with the chunks replaced by
+    # the files made from them.
+    def stitch_chunks(self, settings, scene, items, chunked, exported):
+        start = time.perf_counter()
+        written = set(exported)
+        chunk_files = set()
+        results = []
+        for itemname, item_objects in items:
+            for index in chunked:
+                directory, export_call = self.export_calls[index]
+                first, last = export_call.export_format.frame_range(settings, scene)
+                frames = frame_chunks(first, last, settings.frame_chunk)
+                chunks = [item_filepath(settings, directory, itemname,
+                                        chunk_extension(f[0], f[1], export_call.extension))
+                          for f in frames]
+                chunk_files.update(chunks)
+                if not chunks or not all(chunk in written for chunk in chunks):
+                    continue  # A chunk failed, which is reported with the failed items
+
+                fp = item_filepath(settings, directory, itemname, export_call.extension)
+                stitch_start = time.perf_counter()
+                stitched = False
+                try:
+                    if len(chunks) == 1:
+                        os.replace(chunks[0], fp)
+                        stitched = True
+                    elif export_call.export_format.stitch:
+                        # Stitched next to it then renamed, like Atomic Writes
+                        root, ext = os.path.splitext(fp)
+                        temp = root + ".stitching" + ext
+                        stitched = export_call.export_format.stitch(temp, chunks)
+                        if stitched:
+                            os.replace(temp, fp)
+                except (OSError, subprocess.CalledProcessError) as e:
+                    print("stitching failed: ", fp, e)
+                if stitched:
+                    for chunk in chunks:
+                        if os.path.isfile(chunk):
+                            os.remove(chunk)
+                    results.append(fp)
+                    print("stitched: ", fp)
+                else:
+                    results += chunks + [write_chunk_list(fp, chunks, frames)]
+                seconds = time.perf_counter() - stitch_start
+                self.item_reports.append({"name": itemname, "files": [fp] if stitched else chunks,
+                                          "stitch": seconds, "total": seconds})
+        self.timings["stitch"] = time.perf_counter() - start
+        return [fp for fp in exported if fp not in chunk_files] + results
+
+    # Splits the planned items between several background Blender processes,
+    # that each open the saved .blend file and export their share of the items
+    def execute_parallel(self, context, base_dir, items):
+        try:
+            return self.run_workers(context, base_dir, items)
+        finally:
+            self.release_lock()
+
+    def run_workers(self, context, base_dir, items):
+        if not bpy.data.filepath:
+            self.report({'ERROR'}, "Save .blend file somewhere before a parallel export")
+            return {'CANCELLED'}
+        if bpy.data.is_dirty:
+            self.report(
+                {'ERROR'}, "Save .blend file before a parallel export\n(workers export the saved file, not unsaved changes)")
+            return {'CANCELLED'}
+        if not items:
+            self.report({'ERROR'}, "NOTHING TO EXPORT")
+            return {'CANCELLED'}
+
+        settings = context.scene.batch_export
+        chunked = self.chunked_calls(settings)
+        units = self.plan_units(settings, context.scene, items, chunked)
+        start = time.perf_counter()
+        exported, failed, worker_count = self.run_units(context, units, chunked)
+        self.timings["export"] = time.perf_counter() - start
+        if chunked:
+            exported = self.stitch_chunks(settings, context.scene, items, chunked, exported)
+        self.file_count = len(exported)
+        linked = self.write_instances(context.scene.batch_export, base_dir)
+        self.linked_count = len(linked)
+        self.update_manifest(context.scene.batch_export, base_dir, exported + linked)
+        self.finish_report(context.scene.batch_export, base_dir)
+
+        for failure in failed:
+            print("failed: ", failure["name"], failure["error"])
+        if failed:
+            self.report({'ERROR'}, "Exported " + str(self.file_count) + " file(s), " +
+                        str(len(failed)) + " failed (see console)")
+            return {'CANCELLED'}
+        if self.file_count == 0:
+            self.report({'ERROR'}, "NOTHING TO EXPORT")
+            return {'CANCELLED'}
+        self.report({'INFO'}, "Exported " + str(self.file_count) +
+                    " file(s) with " + str(worker_count) + " worker(s)" + self.summary_message())
         return {'FINISHED'}
 
-    def select_children_recursive(self, obj, context):
-        for c in obj.children:
-            if obj.type in context.scene.batch_export.object_types:
-                c.select_set(True)
-            self.select_children_recursive(c, context)
+    # Exports the units (see plan_units) with background workers. Workers that go over the
+    # Memory Limit stop early, and the units they didn't get to are dealt out to new workers,
+    # so no process grows past the limit for long. worker_count is how many workers to run
+    # at once, by default the Workers setting. Returns the (exported file paths,
+    # failed items, number of workers used at the start).
+    def run_units(self, context, units, chunked=(), worker_count=None):
+        settings = context.scene.batch_export
+        file_total = sum(1 if "frames" in unit else len(self.export_calls) - len(chunked)
+                         for unit in units)
+        if worker_count is None:
+            # A worker count of 0 means one worker per CPU core
+            worker_count = settings.worker_count or os.cpu_count() or 1
+        worker_count = min(worker_count, len(units))
+        print("Batch exporting " + str(file_total) + " file(s) with " +
+              str(worker_count) + " worker(s)")
+
+        temp_dir = tempfile.mkdtemp(prefix="batch_export_")
+        exported = []
+        failed = []
+        done = 0
+        rounds = 0
+        wm = context.window_manager
+        wm.progress_begin(0, file_total)
+        try:
+            while units:
+                workers = []
+                count = min(worker_count, len(units))
+                for w in range(count):
+                    name = str(rounds) + "_" + str(w) + ".json"
+                    shard_path = os.path.join(temp_dir, "shard_" + name)
+                    shard = {
+                        "result": os.path.join(temp_dir, "result_" + name),
+                        # What the run resolved, not what's saved in the .blend file
+                        "base_dir": self.base_dir,
+                        "settings": settings_values(settings),
+                        "export_calls": [export_call.to_shard(directory)
+                                         for directory, export_call in self.export_calls],
+                        "textures": self.texture_paths,
+                        "chunked": list(chunked),
+                        # Deal the items out like cards so every worker gets a similar mix
+                        # (and the chunks of an item go to different workers)
+                        "items": units[w::count],
+                    }
+                    with open(shard_path, 'w') as file:
+                        json.dump(shard, file)
+                    workers.append(ExportWorker(w, shard_path, shard))
+                try:
+                    for worker in workers:
+                        worker.start()
+                    while any(worker.running() for worker in workers):
+                        wm.progress_update(done + sum(worker.exported for worker in workers))
+                        time.sleep(0.1)
+                finally:
+                    for worker in workers:
+                        worker.stop()
+
+                units = []
+                for worker in workers:
+                    worker_exported, worker_failed, worker_reports, remaining = worker.results()
+                    exported += worker_exported
+                    failed += worker_failed
+                    self.item_reports += worker_reports
+                    units += remaining
+                done = len(exported)
+                rounds += 1
+                if units:
+                    print("Starting new workers for " + str(len(units)) +
+                          " item(s) left by workers over the memory limit")
+        finally:
+            wm.progress_end()
+            shutil.rmtree(temp_dir, ignore_errors=True)
+        return exported, failed, worker_count
+
+    # Exports the items listed in the shard file, then writes which succeeded
+    # and which failed to the shard's result file for the main process
+    def execute_shard(self, context):
+        with open(self.shard, 'r') as file:
+            shard = json.load(file)
+
+        set_settings_values(context.scene.batch_export, shard["settings"])
+        base_dir = shard["base_dir"]
+        self.export_calls = [ExportCall.from_shard(data) for data in shard["export_calls"]]
+        self.file_count = 0
+        self.run_start = time.perf_counter()
+        self.timings = {}
+        self.item_reports = []
+
+        exported = []
+        failed = []
+        if context.view_layer.objects.active:
+            bpy.ops.object.mode_set(mode='OBJECT')  # Only works in Object mode
+        self.selected = context.selected_objects
+        settings = context.scene.batch_export
+        self.start_post_processing(settings)
+        # The main process already copied the textures
+        self.texture_paths = shard.get("textures", {})
+        self.material_images = {}
+        self.image_originals = {}
+        chunked = shard.get("chunked", [])
+        export_calls = [call for index, call in enumerate(self.export_calls) if index not in chunked]
+        self.start_memory_tracking(settings)
+        remaining = []
+        for index, item in enumerate(shard["items"]):
+            try:
+                record = {"name": item["name"]}
+                select_start = time.perf_counter()
+                item_objects = [bpy.data.objects[obj_name] for obj_name in item["objects"]]
+                self.select_only(item_objects)
+                record["select"] = time.perf_counter() - select_start
+                if "frames" in item:
+                    # One chunk of frames, exported to its own file for the main process to stitch
+                    first, last = item["frames"]
+                    record["frames"] = item["frames"]
+                    # The staging scene has the scene's frame range (even if the chunk creates it),
+                    # and both get it back so the next units export every frame
+                    frame_range = (context.scene.frame_start, context.scene.frame_end)
+                    try:
+                        for scene in (context.scene, self.staging_scene):
+                            if scene is not None:
+                                set_frame_range(scene, first, last)
+                        directory, export_call = self.export_calls[item["call"]]
+                        files = self.export_selection(item["name"], item_objects, context, base_dir,
+                                                      record, [(directory, export_call.for_frames(first, last))])
+                        record.pop("written")  # Chunks aren't post processed, they're stitched
+                    finally:
+                        for scene in (context.scene, self.staging_scene):
+                            if scene is not None:
+                                set_frame_range(scene, *frame_range)
+                else:
+                    files = self.export_selection(
+                        item["name"], item_objects, context, base_dir, record, export_calls)
+                    self.post_process(settings, record, files)
+                exported += files
+            except Exception as e:
+                failed.append({"name": item["name"], "error": str(e)})
+                continue
+            # Leave the rest to a new worker when this one is over the Memory Limit
+            # (always after exporting at least one item, so the export keeps moving)
+            if self.check_memory(settings, record) and index + 1 < len(shard["items"]):
+                remaining = shard["items"][index + 1:]
+                print("Over the memory limit, leaving " + str(len(remaining)) + " item(s) to a new worker")
+                break
+
+        self.remove_staging_scene()
+        restore_image_paths(self.image_originals)
+        self.finish_post_processing()
+        hash_index_entries(base_dir, self.item_reports)
+        with open(shard["result"], 'w') as file:
+            json.dump({"exported": exported, "failed": failed, "items": self.item_reports,
+                       "remaining": remaining}, file)
+        return {'FINISHED'}
 
-    def export_selection(self, itemname, context, base_dir):
+    # Selects only item_objects. Instead of deselecting everything with
+    # bpy.ops.object.select_all (an operator call that goes through the whole
+    # view layer for every item), only the objects select_only selected last
+    # time are deselected.
+    def select_only(self, item_objects):
+        for obj in self.selected:
+            obj.select_set(False)
+        for obj in item_objects:
+            obj.select_set(True)
+        self.selected = item_objects
+
+    # Links copies of item_objects (sharing their data) into the staging scene, and sets
+    # the transform overrides on the copies, so the user's objects (and everything that
+    # depends on them, like constraints, drivers and children) are never changed.
+    # The copies take their originals' names while they're exported, since exporters
+    # write object names into the files. Returns the (copies, original names).
+    def stage(self, item_objects, context, settings):
+        if self.staging_scene is None:
+            self.staging_scene = create_staging_scene(context.scene)
+        view_layer = self.staging_scene.view_layers[0]
+
+        copies = {}
+        names = []
+        try:
+            for obj in item_objects:
+                copy = obj.copy()
+                copies[obj.as_pointer()] = copy
+                names.append(obj.name)
+                obj.name = "batch_export_original"  # Blender makes it unique if needed
+                copy.name = names[-1]
+            for obj in item_objects:
+                copy = copies[obj.as_pointer()]
+                # Parent to the copy of the parent when it's in the item (copy() keeps
+                # matrix_parent_inverse, so it's positioned the same relative to it)
+                if obj.parent and obj.parent.as_pointer() in copies:
+                    copy.parent = copies[obj.parent.as_pointer()]
+                point_at_copies(copy, copies)
+                self.staging_scene.collection.objects.link(copy)
+                copy.select_set(True, view_layer=view_layer)
+                set_transform_overrides(copy, settings)
+        except Exception:
+            # Don't leave the originals renamed if staging fails part way
+            self.unstage(item_objects, (list(copies.values()), names))
+            raise
+        return list(copies.values()), names
+
+    # Removes the copies made by stage and gives the originals their names back
+    # (the copies go first, so the names are free again)
+    def unstage(self, item_objects, staged):
+        copies, names = staged
+        for copy in copies:
+            bpy.data.objects.remove(copy)
+        for obj, name in zip(item_objects, names):
+            obj.name = name
+
+    def remove_staging_scene(self):
+        if self.staging_scene is not None:
+            bpy.data.scenes.remove(self.staging_scene)
+            self.staging_scene = None
+
+    # Exports one file, pointing the item's images at their shared copies first
+    # if the format can refer to them
+    # Returns the paths of the files it wrote, with fp last. Without Atomic Writes
+    # those are fp and the format's sidecars written by this export.
+    def export_file(self, export_call, fp, images, settings):
+        def export(path):
+            if images and export_call.export_format.texture_options:
+                point_images(images, self.texture_paths, os.path.dirname(path),
+                             os.path.dirname(fp), self.image_originals)
+            export_call(path)
+
+        if settings.atomic_writes:
+            return export_atomic(export, fp)
+        start = time.time() - 2  # Some file systems only store the time in 2 second steps
+        export(fp)
+        root = os.path.splitext(fp)[0]
+        sidecars = [root + ext for ext in export_call.export_format.sidecars]
+        return [path for path in sidecars
+                if os.path.isfile(path) and os.path.getmtime(path) >= start] + [fp]
+
+    # Exports the selected item_objects to a file named after itemname, for each format.
+    # Returns the paths of the files written.
+    # record is a dictionary for this item's report, which gets the time
+    # each step took and the size of the files written.
+    # export_calls is the list of (directory, ExportCall) to export with, if not all of them.
+    def export_selection(self, itemname, item_objects, context, base_dir, record, export_calls=None):
         settings = context.scene.batch_export
-        # save the transform to be reset later:
-        old_locations = []
-        old_rotations = []
-        old_scales = []
-        for obj in context.selected_objects:
-            old_locations.append(obj.location.copy())
-            old_rotations.append(obj.rotation_euler.copy())
-            old_scales.append(obj.scale.copy())
-
-            # If exporting by parent, don't set child (object that has a parent) transform
-            if settings.mode != "OBJECT_PARENTS" or not obj.parent:
-                if settings.set_location:
-                    obj.location = settings.location
-                if settings.set_rotation:
-                    obj.rotation_euler = settings.rotation
-                if settings.set_scale:
-                    obj.scale = settings.scale
+        start = time.perf_counter()
+        staging = settings.transform_mode == 'STAGING' and (
+            settings.set_location or settings.set_rotation or settings.set_scale)
+        object_names = [obj.name for obj in item_objects]  # Staging renames the originals
+        if staging:
+            staged = self.stage(item_objects, context, settings)
+        else:
+            # save the transform to be reset later:
+            old_locations = []
+            old_rotations = []
+            old_scales = []
+            for obj in item_objects:
+                old_locations.append(obj.location.copy())
+                old_rotations.append(obj.rotation_euler.copy())
+                old_scales.append(obj.scale.copy())
+                set_transform_overrides(obj, settings)
 
         # Some exporters only use the active object: #I think this isn't true anymore
         # view_layer.objects.active = obj
 
-        prefix = settings.prefix
-        suffix = settings.suffix
-        name = prefix + bpy.path.clean_name(itemname) + suffix
-        fp = os.path.join(base_dir, name)
-
-        # Export
-
-        if settings.file_format == "DAE":
-            options = load_operator_preset(
-                'wm.collada_export', settings.dae_preset)
-            options["filepath"] = fp
-            options["selected"] = True
-            options["apply_modifiers"] = settings.apply_mods
-            bpy.ops.wm.collada_export(**options)
-
-        elif settings.file_format == "ABC":
-            options = load_operator_preset(
-                'wm.alembic_export', settings.abc_preset)
-            options["filepath"] = fp+".abc"
-            options["selected"] = True
-            options["start"] = settings.frame_start
-            options["end"] = settings.frame_end
-            # By default, alembic_export operator runs in the background, this messes up batch
-            # export though. alembic_export has an "as_background_job" arg that can be set to
-            # false to disable it, but its marked deprecated, saying that if you EXECUTE the
-            # operator rather than INVOKE it it runs in the foreground. Here I change the
-            # execution context to EXEC_REGION_WIN.
-            # docs.blender.org/api/current/bpy.ops.html?highlight=exec_default#execution-context
-            bpy.ops.wm.alembic_export('EXEC_REGION_WIN', **options)
-
-        elif settings.file_format == "USD":
-            options = load_operator_preset(
-                'wm.usd_export', settings.usd_preset)
-            options["filepath"] = fp+settings.usd_format
-            options["selected_objects_only"] = True
-            bpy.ops.wm.usd_export(**options)
-
-        elif settings.file_format == "SVG":
-            bpy.ops.wm.gpencil_export_svg(
-                filepath=fp+".svg", selected_object_type='SELECTED')
-
-        elif settings.file_format == "PDF":
-            bpy.ops.wm.gpencil_export_pdf(
-                filepath=fp+".pdf", selected_object_type='SELECTED')
-
-        elif settings.file_format == "OBJ":
-            options = load_operator_preset(
-                'wm.obj_export', settings.obj_preset)
-            options["filepath"] = fp+".obj"
-            options["export_selected_objects"] = True
-            options["apply_modifiers"] = settings.apply_mods
-            bpy.ops.wm.obj_export(**options)
-
-        elif settings.file_format == "PLY":
-            bpy.ops.export_mesh.ply(
-                filepath=fp+".ply", use_ascii=settings.ply_ascii, use_selection=True, use_mesh_modifiers=settings.apply_mods)
-
-        elif settings.file_format == "STL":
-            bpy.ops.export_mesh.stl(
-                filepath=fp+".stl", ascii=settings.stl_ascii, use_selection=True, use_mesh_modifiers=settings.apply_mods)
-
-        elif settings.file_format == "FBX":
-            options = load_operator_preset(
-                'export_scene.fbx', settings.fbx_preset)
-            options["filepath"] = fp+".fbx"
-            options["use_selection"] = True
-            options["use_mesh_modifiers"] = settings.apply_mods
-            bpy.ops.export_scene.fbx(**options)
-
-        elif settings.file_format == "glTF":
-            options = load_operator_preset(
-                'export_scene.gltf', settings.gltf_preset)
-            options["filepath"] = fp
-            options["use_selection"] = True
-            options["export_apply"] = settings.apply_mods
-            bpy.ops.export_scene.gltf(**options)
-
-        elif settings.file_format == "X3D":
-            options = load_operator_preset(
-                'export_scene.x3d', settings.x3d_preset)
-            options["filepath"] = fp+".x3d"
-            options["use_selection"] = True
-            options["use_mesh_modifiers"] = settings.apply_mods
-            bpy.ops.export_scene.x3d(**options)
-
-        # Reset the transform to what it was before
-        i = 0
-        for obj in context.selected_objects:
-            obj.location = old_locations[i]
-            obj.rotation_euler = old_rotations[i]
-            obj.scale = old_scales[i]
-            i += 1
-
-        print("exported: ", fp)
-        self.file_count += 1
+        export_start = time.perf_counter()
+        record["transform_set"] = export_start - start
+
+        images = []
+        if self.texture_paths:
+            images = item_images(item_objects, self.material_images)
+        index = []
+        summaries = {}  # LOD: item_summary, since LODs have different geometry
+
+        # Export to every format (and LOD) while the item is selected and transformed
+        exported = []
+        written = []  # For each file in exported, every file its export wrote
+        lod = None
+        lod_modifiers = []
+        if export_calls is None:
+            export_calls = self.export_calls
+        try:
+            for directory, export_call in export_calls:
+                if export_call.lod != lod:
+                    lod = export_call.lod
+                    remove_lod_modifiers(lod_modifiers)
+                    lod_modifiers = []
+                    if lod[1] < 1.0:
+                        lod_modifiers = add_lod_modifiers(staged[0] if staging else item_objects, lod[1])
+                fp = item_filepath(settings, directory, itemname, export_call.extension)
+                if staging:
+                    # Export from the staging scene, where only the copies are selected
+                    with context.temp_override(scene=self.staging_scene,
+                                               view_layer=self.staging_scene.view_layers[0]):
+                        written.append(self.export_file(export_call, fp, images, settings))
+                else:
+                    written.append(self.export_file(export_call, fp, images, settings))
+                exported.append(fp)
+                # Chunks of frames aren't indexed, they're stitched into other files
+                if settings.index_format != 'NONE' and not export_call.frames and os.path.isfile(fp):
+                    if export_call.lod not in summaries:
+                        if staging:
+                            depsgraph = self.staging_scene.view_layers[0].depsgraph
+                        else:
+                            depsgraph = context.evaluated_depsgraph_get()
+                        summaries[export_call.lod] = item_summary(
+                            staged[0] if staging else item_objects, depsgraph, settings.apply_mods)
+                    index.append(index_entry(base_dir, fp, export_call, itemname, item_objects,
+                                             object_names, summaries[export_call.lod]))
+        finally:
+            # Always remove the LOD modifiers and reset the transform to what it was
+            # before (giving staged originals their names back), even if an exporter failed
+            reset_start = time.perf_counter()
+            record["export"] = reset_start - export_start
+            remove_lod_modifiers(lod_modifiers)
+            if staging:
+                self.unstage(item_objects, staged)
+            else:
+                i = 0
+                for obj in item_objects:
+                    obj.location = old_locations[i]
+                    obj.rotation_euler = old_rotations[i]
+                    obj.scale = old_scales[i]
+                    i += 1
+
+        record["transform_reset"] = time.perf_counter() - reset_start
+        record["files"] = exported
+        record["written"] = written  # Taken out again by post_process
+        record["bytes"] = sum(os.path.getsize(fp) for fp in exported if os.path.isfile(fp))
+        if index:
+            record["index"] = index
+        record["total"] = time.perf_counter() - start + record.get("select", 0.0)
+        self.item_reports.append(record)
+
+        for fp in exported:
+            print("exported: ", fp)
+        self.file_count += len(exported)
+        return exported
+
+# Looks for presets again, for example after adding one in a new preset folder
+class EXPORT_MESH_OT_batch_refresh_presets(Operator):
+    """Look for new or changed presets"""
+    bl_idname = "export_mesh.batch_refresh_presets"
+    bl_label = "Refresh Presets"
+    bl_options = {'INTERNAL'}
+
+    def execute(self, context):
+        clear_preset_caches()
+        for area in context.screen.areas if context.screen else []:
+            area.tag_redraw()
+        return {'FINISHED'}
+
+# Adds a format to export to when exporting to multiple formats
+class EXPORT_MESH_OT_batch_format_add(Operator):
+    """Add a format to export each item to"""
+    bl_idname = "export_mesh.batch_format_add"
+    bl_label = "Add Format"
+    bl_options = {'UNDO', 'INTERNAL'}
+
+    def execute(self, context):
+        settings = context.scene.batch_export
+        target = settings.formats.add()
+        target.file_format = settings.file_format
+        return {'FINISHED'}
+
+class EXPORT_MESH_OT_batch_format_remove(Operator):
+    """Stop exporting to this format"""
+    bl_idname = "export_mesh.batch_format_remove"
+    bl_label = "Remove Format"
+    bl_options = {'UNDO', 'INTERNAL'}
+
+    index: IntProperty()
+
+    def execute(self, context):
+        context.scene.batch_export.formats.remove(self.index)
+        return {'FINISHED'}
+
+# One of the formats to export to when exporting to multiple formats
+class BatchExportFormat(PropertyGroup):
+    file_format: EnumProperty(
+        name="Format",
+        description="Which file format to export to",
+        items=lambda self, context: format_enum_items,
+        default=6,  # glTF
+    )
+    subdirectory: StringProperty(
+        name="Subdirectory",
+        description="Folder inside the export directory to put this format's files in\nLeave empty to put them in the export directory",
+    )
 
 # Groups together all the addon settings that are saved in each .blend file
 class BatchExportSettings(PropertyGroup):
@@ -435,26 +2885,58 @@ class BatchExportSettings(PropertyGroup):
         name="Suffix",
         description="Text to put at the end of all the exported file names",
     )
+    atomic_writes: BoolProperty(
+        name="Atomic Writes",
+        description="Export each file into a hidden folder first, then move it into place once it's complete,\nso a crash or failed export never leaves a half written file.\nPresets that write Relative texture paths write them relative to the hidden folder",
+        default=False,
+    )
+    lock_directory: BoolProperty(
+        name="Lock Directory",
+        description="Stop if another batch export (from this or another computer) is exporting\nto the same directory, instead of both overwriting each other's files",
+        default=False,
+    )
+
+    report_format: EnumProperty(
+        name="Report",
+        description="Write a report with the time each step took and the size of each file\nnext to the exported files",
+        items=[
+            ("NONE", "None", "Don't write a report", 1),
+            ("JSON", "JSON (.json)", "All timings of the run and of each item", 2),
+            ("CSV", "CSV (.csv)", "One row of timings for each item", 3),
+        ],
+        default="NONE",
+    )
+    index_format: EnumProperty(
+        name="Asset Index",
+        description="Write an index of every exported file next to them, with its size, hash, bounds,\nvertex and triangle counts, materials and source objects, so other tools don't need to open the files",
+        items=[
+            ("NONE", "None", "Don't write an index", 1),
+            ("JSON", "JSON (.json)", "Write " + index_name + ".json", 2),
+            ("BINARY", "JSON and Binary (.json, .bin)", "Also write a compact binary " + index_name + ".bin", 3),
+        ],
+        default="NONE",
+    )
+    show_report: BoolProperty(name="Show Last Export", default=False)
+    report_slowest: IntProperty(
+        name="Slowest Items",
+        description="How many of the slowest items from the last export to show",
+        min=1,
+        default=5,
+    )
 
     # Export Settings:
     file_format: EnumProperty(
         name="Format",
         description="Which file format to export to",
-        items=[
-            ("DAE", "Collada (.dae)", "", 1),
-            ("ABC", "Alembic (.abc)", "", 9),
-            ("USD", "Universal Scene Description (.usd/.usdc/.usda)", "", 2),
-            ("SVG", "Grease Pencil as SVG (.svg)", "", 10),
-            ("PDF", "Grease Pencil as PDF (.pdf)", "", 11),
-            ("OBJ", "Wavefront (.obj)", "", 7),
-            ("PLY", "Stanford (.ply)", "", 3),
-            ("STL", "STL (.stl)", "", 4),
-            ("FBX", "FBX (.fbx)", "", 5),
-            ("glTF", "glTF (.glb/.gltf)", "", 6),
-            ("X3D", "X3D Extensible 3D (.x3d)", "", 8),
-        ],
-        default="glTF",
+        items=lambda self, context: format_enum_items,
+        default=6,  # glTF
     )
+    multi_format: BoolProperty(
+        name="Multiple Formats",
+        description="Export each item to several formats at once.\nEach item is only selected and transformed once, then exported to every format.\nEach format uses its own preset",
+        default=False,
+    )
+    formats: CollectionProperty(type=BatchExportFormat)
     mode: EnumProperty(
         name="Mode",
         description="What to export",
@@ -464,9 +2946,23 @@ class BatchExportSettings(PropertyGroup):
              "Same as 'Objects', but objects that are parents have their\nchildren exported with them instead of by themselves", 2),
             ("COLLECTIONS", "Collections",
              "Each collection is exported into its own file", 3),
+            ("PROPERTY", "Custom Property",
+             "Objects with the same value of a custom property are exported to the same file,\nnamed after the value", 4),
+            ("NAME_PATTERN", "Name Pattern",
+             "Objects whose names match a pattern the same way are exported to the same file,\nnamed after the matching part", 5),
         ],
         default="OBJECT_PARENTS",
     )
+    group_property: StringProperty(
+        name="Property",
+        description="Name of the object custom property to group objects by (objects without it aren't exported)",
+        default="asset_id",
+    )
+    group_pattern: StringProperty(
+        name="Pattern",
+        description="Regular expression searched for in each object's name. Objects are grouped by the first\n(bracketed) group it captures, or by everything it matched if it has no groups\n(objects it doesn't match aren't exported)",
+        default=r"^[^_.]+",
+    )
     limit: EnumProperty(
         name="Limit to",
         description="How to limit which objects are exported",
@@ -475,6 +2971,27 @@ class BatchExportSettings(PropertyGroup):
             ("SELECTED", "Selected", "", 2),
         ],
     )
+    incremental: BoolProperty(
+        name="Incremental",
+        description="Only export items that changed since they were last exported to this directory,\nor whose file is missing.\nChanges are tracked in a .batch_export_manifest.json file in the directory",
+        default=False,
+    )
+    use_modal: BoolProperty(
+        name="Show Progress",
+        description="Export a few items at a time so Blender doesn't freeze, showing the progress,\nitems per second and time left in the status bar. Press Esc to cancel",
+        default=False,
+    )
+    parallel: BoolProperty(
+        name="Parallel Export",
+        description="Split the export between several background Blender processes.\nThey export the saved .blend file, so save before exporting",
+        default=False,
+    )
+    worker_count: IntProperty(
+        name="Workers",
+        description="How many background Blender processes to export with\n0 uses one for each CPU core",
+        min=0,
+        default=0,
+    )
 
     # Format specific options:
     usd_format: EnumProperty(
@@ -564,6 +3081,26 @@ class BatchExportSettings(PropertyGroup):
         description="Should the modifiers by applied onto the exported mesh?\nCan't export Shape Keys with this on",
         default=True,
     )
+    use_lods: BoolProperty(
+        name="LODs",
+        description="Export each item several times with fewer faces, to name_LOD0, name_LOD1...\nThe faces are reduced with a Decimate modifier, so Apply Modifiers needs to be on",
+        default=False,
+    )
+    lod_ratios: StringProperty(
+        name="LOD Ratios",
+        description="How much of the faces each LOD keeps, separated by commas (1 keeps every face)",
+        default="1, 0.5, 0.25, 0.125",
+    )
+    share_textures: BoolProperty(
+        name="Shared Textures",
+        description="Copy the images used by the exported items to one folder in the export directory,\neach only once, and have the files refer to the copies instead of embedding or copying them\n(OBJ, FBX, DAE, USD and X3D)",
+        default=False,
+    )
+    texture_directory: StringProperty(
+        name="Texture Folder",
+        description="Folder inside the export directory to copy the shared textures to",
+        default="textures",
+    )
     frame_start: IntProperty(
         name="Frame Start",
         min=0,
@@ -576,6 +3113,24 @@ class BatchExportSettings(PropertyGroup):
         description="Last frame to export",
         default = 1,
     )
+    frame_chunk: IntProperty(
+        name="Frames per Chunk",
+        min=0,
+        description="Split the frame range into chunks of this many frames, exported at the same time by\nbackground workers (like Parallel Export) and then stitched back into one file\n0 exports the whole frame range at once",
+        default=0,
+    )
+    memory_limit: IntProperty(
+        name="Memory Limit (MB)",
+        description="When Blender uses more memory than this after an item, free what the exporters left behind,\nand if it's still over, export the rest of the items with a fresh background worker\n(needs the .blend file saved). Workers over it are replaced by new ones.\n0 for no limit",
+        min=0,
+        default=0,
+    )
+    cleanup_interval: IntProperty(
+        name="Clean Up Every",
+        description="Free the temporary data exporters left behind every this many items\n0 only cleans up when over the Memory Limit",
+        min=0,
+        default=0,
+    )
     object_types: EnumProperty(
         name="Object Types",
         options={'ENUM_FLAG'},
@@ -595,7 +3150,62 @@ class BatchExportSettings(PropertyGroup):
         default={'MESH', 'CURVE', 'SURFACE', 'META', 'FONT', 'GPENCIL', 'ARMATURE'},
     )
 
+    dedup: EnumProperty(
+        name="Shared Meshes",
+        description="What to do with items that share the same mesh (like instanced props)\nOnly used by the Objects and Objects by Parents modes",
+        items=[
+            ("NONE", "Export Each", "Export every item, even if it shares its mesh", 1),
+            ("LINK", "Hardlink Duplicates",
+             "Export each mesh once, and hardlink the files of the items sharing it\n(copies them if the drive can't hardlink)", 2),
+            ("MANIFEST", "Instance List",
+             "Export each mesh once, and list the items sharing it with their transforms in " + instances_name, 3),
+        ],
+        default="NONE",
+    )
+    dedup_geometry: BoolProperty(
+        name="Compare Geometry",
+        description="Find shared meshes by comparing their geometry after modifiers,\ninstead of only by which mesh datablock they use",
+        default=False,
+    )
+
+    # Post Processing:
+    compressors: EnumProperty(
+        name="Post Processing",
+        options={'ENUM_FLAG'},
+        items=[
+            ('DRACO', "Draco", "Compress glTF meshes with Draco\n(needs gltf-transform on the PATH)", 1),
+            ('MESHOPT', "meshopt", "Compress glTF meshes with meshoptimizer\n(needs gltfpack on the PATH)", 2),
+            ('GZIP', "gzip", "Write a gzip compressed copy (.gz) of each file", 4),
+            ('ZSTD', "Zstandard", "Write a Zstandard compressed copy (.zst) of each file\n(needs the zstandard Python module)", 8),
+            ('ZIP', "Zip", "Bundle each item's files (from every format) into one .zip", 16),
+        ],
+        description="Compress or bundle each exported file.\nRuns in the background while the next items export",
+        default=set(),
+    )
+    remove_originals: BoolProperty(
+        name="Remove Uncompressed",
+        description="Delete each exported file after a compressed copy or zip of it is written",
+        default=False,
+    )
+    compress_workers: IntProperty(
+        name="Threads",
+        description="How many files to post process at the same time\n0 uses one thread for each CPU core",
+        min=0,
+        default=0,
+    )
+
     # Transform:
+    transform_mode: EnumProperty(
+        name="Set Transform On",
+        description="How the transform is set on each item's objects while it's exported",
+        items=[
+            ("IN_PLACE", "Objects",
+             "Set the transform on the objects themselves, then set it back after exporting.\nThe objects and everything depending on them (constraints, drivers, children) are updated twice for each item", 1),
+            ("STAGING", "Staging Copies",
+             "Export linked copies of each item's objects from a temporary scene, with the transform set on the copies.\nThe original objects are never changed, which is faster for rigged scenes", 2),
+        ],
+        default="IN_PLACE",
+    )
     set_location: BoolProperty(name="Set Location", default=True)
     location: FloatVectorProperty(name="Location", default=(
         0.0, 0.0, 0.0), subtype="TRANSLATION")
@@ -606,13 +3216,98 @@ class BatchExportSettings(PropertyGroup):
     scale: FloatVectorProperty(
         name="Scale", default=(1.0, 1.0, 1.0), subtype="XYZ")
 
+# Converts the text of a command line argument to the value for a BatchExportSettings property
+def cli_parse_value(prop, text):
+    if prop.type == 'BOOLEAN':
+        if text.lower() in ('1', 'true', 'yes', 'on'):
+            return True
+        if text.lower() in ('0', 'false', 'no', 'off'):
+            return False
+        raise ValueError(text)
+    if prop.type == 'ENUM' and prop.is_enum_flag:
+        return {v for v in text.split(',') if v}
+    if prop.type in ('INT', 'FLOAT'):
+        cast = int if prop.type == 'INT' else float
+        if prop.array_length:
+            return [cast(v) for v in text.split(',')]
+        return cast(text)
+    return text
+
+# Adds a --<setting> argument for every saved BatchExportSettings property,
+# so the command line can set anything the UI can
+def cli_add_settings_arguments(parser):
+    group = parser.add_argument_group(
+        "export settings", "Override the batch export settings saved in each .blend file")
+    for prop in BatchExportSettings.bl_rna.properties:
+        if prop.identifier == 'rna_type' or prop.is_skip_save or prop.type in ('POINTER', 'COLLECTION'):
+            continue
+        if prop.type == 'ENUM' and prop.identifier == 'file_format':
+            metavar = "{" + ",".join(export_formats) + "}"
+        elif prop.type == 'ENUM':
+            metavar = "{" + ",".join(item.identifier for item in prop.enum_items) + "}"
+        elif prop.type == 'BOOLEAN':
+            metavar = "{true,false}"
+        elif getattr(prop, "array_length", 0):
+            metavar = ",".join(["X", "Y", "Z"][:prop.array_length])
+        else:
+            metavar = prop.type
+        group.add_argument(
+            "--" + prop.identifier, metavar=metavar, help=prop.description.replace("\n", " "),
+            type=lambda text, prop=prop: cli_parse_value(prop, text))
+
+# Command line entry point (see cli.py and the README).
+# Batch exports each .blend file given (or the open file if none are),
+# overriding its saved settings with the ones given. Files are opened one after
+# another in this Blender process to avoid paying Blender's startup time for each.
+# Returns the exit code: 0 if everything exported, 1 if anything failed.
+def cli_main(argv=None):
+    if argv is None:
+        argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(
+        prog="blender --background --python cli.py --",
+        description="Batch export .blend files with Super Batch Export")
+    parser.add_argument("blend_files", nargs="*", metavar="FILE.blend",
+                        help="The .blend files to export, the open file is exported if none are given")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Only print the files that would be exported, without exporting")
+    cli_add_settings_arguments(parser)
+    args = parser.parse_args(argv)
+
+    overrides = {key: value for key, value in vars(args).items()
+                 if key not in ("blend_files", "dry_run") and value is not None}
+    blend_files = args.blend_files or [None]
+    failed = []
+    for blend_file in blend_files:
+        try:
+            if blend_file:
+                bpy.ops.wm.open_mainfile(filepath=os.path.abspath(blend_file))
+            settings = bpy.context.scene.batch_export
+            for key, value in overrides.items():
+                setattr(settings, key, value)
+            result = bpy.ops.export_mesh.batch(dry_run=args.dry_run)
+        except (RuntimeError, TypeError, ValueError) as e:
+            print("Batch export error: ", e)
+            result = {'CANCELLED'}
+        if 'FINISHED' not in result:
+            failed.append(blend_file or bpy.data.filepath or "(unsaved file)")
+
+    for blend_file in failed:
+        print("Batch export failed: ", blend_file)
+    print("Batch exported " + str(len(blend_files) - len(failed)) +
+          " of " + str(len(blend_files)) + " .blend file(s)")
+    return 1 if failed else 0
+
 
 def register():
     # Register classes
     bpy.utils.register_class(BatchExportPreferences)
+    bpy.utils.register_class(BatchExportFormat)
     bpy.utils.register_class(BatchExportSettings)
     bpy.utils.register_class(POPOVER_PT_batch_export)
     bpy.utils.register_class(EXPORT_MESH_OT_batch)
+    bpy.utils.register_class(EXPORT_MESH_OT_batch_format_add)
+    bpy.utils.register_class(EXPORT_MESH_OT_batch_format_remove)
+    bpy.utils.register_class(EXPORT_MESH_OT_batch_refresh_presets)
 
     # Add batch export settings to Scene type
     bpy.types.Scene.batch_export = PointerProperty(type=BatchExportSettings)
@@ -634,8 +3329,12 @@ def unregister():
     # Unregister Classes
     bpy.utils.unregister_class(BatchExportPreferences)
     bpy.utils.unregister_class(BatchExportSettings)
+    bpy.utils.unregister_class(BatchExportFormat)
     bpy.utils.unregister_class(POPOVER_PT_batch_export)
     bpy.utils.unregister_class(EXPORT_MESH_OT_batch)
+    bpy.utils.unregister_class(EXPORT_MESH_OT_batch_format_add)
+    bpy.utils.unregister_class(EXPORT_MESH_OT_batch_format_remove)
+    bpy.utils.unregister_class(EXPORT_MESH_OT_batch_refresh_presets)
 
     # Remove UI
     bpy.types.TOPBAR_MT_editor_menus.remove(draw_popover)
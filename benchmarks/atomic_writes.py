@@ -0,0 +1,78 @@
+# Measures what Atomic Writes adds to exporting large files: each file is written
+# straight to its final path, then written into a hidden folder and moved into place
+# the way export_atomic does it, and the time per file of both is compared. The
+# "exporter" only writes random bytes, so the difference is the folder and the rename
+# alone. Run with Blender in the background:
+#
+#   blender --background --factory-startup --python benchmarks/atomic_writes.py -- \
+#       [--size 256] [--files 8] [--directory /path/on/the/drive/to/test]
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import importlib
+import addon_utils
+import bpy
+
+addon_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+module_name = os.path.basename(addon_dir)
+if os.path.dirname(addon_dir) not in sys.path:
+    sys.path.append(os.path.dirname(addon_dir))
+
+
+# Stands in for an ExportCall, writing size bytes (in 1 MB blocks) to the file path
+class FakeExport:
+    def __init__(self, size):
+        self.block = os.urandom(1 << 20)
+        self.blocks = size
+
+    def __call__(self, filepath):
+        with open(filepath, 'wb') as file:
+            for _ in range(self.blocks):
+                file.write(self.block)
+
+
+def timed(export, fp):
+    start = time.perf_counter()
+    export(fp)
+    return time.perf_counter() - start
+
+
+def main():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=256, help="Size of each file in MB")
+    parser.add_argument("--files", type=int, default=8)
+    parser.add_argument("--directory", default=None,
+                        help="Where to write the files (a temporary folder by default)")
+    args = parser.parse_args(argv)
+
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+    addon_utils.enable(module_name, default_set=True, persistent=True)
+    batch_export = importlib.import_module(module_name)
+
+    directory = tempfile.mkdtemp(prefix="batch_export_bench_", dir=args.directory)
+    export = FakeExport(args.size)
+    try:
+        # Interleaved, so disk caches and throttling affect both the same way
+        direct = []
+        atomic = []
+        for i in range(args.files):
+            direct.append(timed(export, os.path.join(directory, "direct_%d.bin" % i)))
+            atomic.append(timed(lambda fp: batch_export.export_atomic(export, fp),
+                                os.path.join(directory, "atomic_%d.bin" % i)))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    direct_mean = sum(direct) / len(direct)
+    atomic_mean = sum(atomic) / len(atomic)
+    print("%d file(s) of %d MB" % (args.files, args.size))
+    print("direct  %8.3f s per file" % direct_mean)
+    print("atomic  %8.3f s per file" % atomic_mean)
+    print("overhead %+7.3f s per file (%+.1f%%)" % (
+        atomic_mean - direct_mean, (atomic_mean / direct_mean - 1.0) * 100 if direct_mean else 0.0))
+
+
+main()
@@ -0,0 +1,264 @@
+# Benchmarks the whole batch export loop on synthetic scenes, to catch regressions
+# between versions. Each scene is exported in every mode to every format that can
+# export without a GPU, and the wall time, time per item spent outside the exporter
+# itself, peak memory and bytes written are saved to a JSON baseline. Comparing with
+# an older baseline prints how much slower or faster each case got. Run with Blender
+# in the background:
+#
+#   blender --background --factory-startup --python benchmarks/export_loop.py -- \
+#       [--objects 200] [--scenes flat,shared] [--modes OBJECTS] [--formats OBJ,glTF] \
+#       [--output baseline.json] [--compare old_baseline.json] [--threshold 1.1]
+#
+# Scenes:
+#   flat: separate objects, each with its own mesh
+#   hierarchy: parent chains --depth objects deep. Planning the Objects by Parents
+#              mode on a 10k object hierarchy is timed with:
+#              --scenes hierarchy --modes OBJECT_PARENTS --objects 10000 --depth 10000
+#   collections: objects spread over many nested collections
+#   shared: objects sharing a few meshes, for the Shared Meshes option
+#   modifiers: objects with a heavy modifier stack
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import importlib
+import addon_utils
+import bmesh
+import bpy
+
+addon_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+module_name = os.path.basename(addon_dir)
+if os.path.dirname(addon_dir) not in sys.path:
+    sys.path.append(os.path.dirname(addon_dir))
+
+modes = ['OBJECTS', 'OBJECT_PARENTS', 'COLLECTIONS']
+# Grease pencil formats have nothing to export in these scenes
+skip_formats = {'SVG', 'PDF'}
+
+
+def new_scene():
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+    addon_utils.enable(module_name, default_set=True, persistent=True)
+    return bpy.context.scene
+
+
+def new_mesh(name):
+    mesh = bpy.data.meshes.new(name)
+    bm = bmesh.new()
+    bmesh.ops.create_cube(bm, size=1.0)
+    bmesh.ops.subdivide_edges(bm, edges=bm.edges, cuts=3, use_grid_fill=True)
+    bm.to_mesh(mesh)
+    bm.free()
+    return mesh
+
+
+def add_object(name, mesh, collection, index):
+    obj = bpy.data.objects.new(name, mesh)
+    collection.objects.link(obj)
+    obj.location = (index % 32 * 2, index // 32 * 2, 0)
+    return obj
+
+
+def make_flat(args):
+    scene = new_scene()
+    for i in range(args.objects):
+        add_object("flat_" + str(i), new_mesh("flat_" + str(i)), scene.collection, i)
+    return scene
+
+
+def make_hierarchy(args):
+    scene = new_scene()
+    mesh = new_mesh("hierarchy")
+    parent = None
+    for i in range(args.objects):
+        obj = add_object("node_" + str(i), mesh, scene.collection, i)
+        obj.parent = parent if i % args.depth else None
+        parent = obj
+    return scene
+
+
+def make_collections(args):
+    scene = new_scene()
+    mesh = new_mesh("collections")
+    parent = scene.collection
+    for i in range(args.objects):
+        if i % 10 == 0:
+            collection = bpy.data.collections.new("group_" + str(i // 10))
+            # Nest every other collection in the one before it
+            (parent if i % 20 else scene.collection).children.link(collection)
+            parent = collection
+        add_object("member_" + str(i), mesh, collection, i)
+    return scene
+
+
+def make_shared(args):
+    scene = new_scene()
+    meshes = [new_mesh("shared_" + str(i)) for i in range(10)]
+    for i in range(args.objects):
+        add_object("instance_" + str(i), meshes[i % len(meshes)], scene.collection, i)
+    return scene
+
+
+def make_modifiers(args):
+    scene = new_scene()
+    mesh = new_mesh("modifiers")
+    for i in range(max(1, args.objects // 10)):
+        obj = add_object("stack_" + str(i), mesh, scene.collection, i)
+        obj.modifiers.new("bevel", 'BEVEL').segments = 2
+        obj.modifiers.new("array", 'ARRAY').count = 3
+        obj.modifiers.new("subsurf", 'SUBSURF').levels = 2
+        obj.modifiers.new("displace", 'DISPLACE').strength = 0.1
+    return scene
+
+
+scenes = {
+    'flat': make_flat,
+    'hierarchy': make_hierarchy,
+    'collections': make_collections,
+    'shared': make_shared,
+    'modifiers': make_modifiers,
+}
+
+
+# Formats whose exporter is available in this Blender (some were removed or are addons)
+def available_formats(batch_export):
+    available = []
+    for identifier, export_format in batch_export.export_formats.items():
+        if identifier in skip_formats:
+            continue
+        category, name = export_format.operator.split(".")
+        try:
+            getattr(getattr(bpy.ops, category), name).get_rna_type()
+        except (AttributeError, KeyError):
+            continue
+        available.append(identifier)
+    return available
+
+
+# Linux keeps the peak memory of a process in VmHWM, which can be reset between cases
+def reset_peak_memory():
+    try:
+        with open("/proc/self/clear_refs", 'w') as file:
+            file.write("5")
+    except OSError:
+        pass
+
+
+def peak_memory():
+    try:
+        with open("/proc/self/status") as file:
+            for line in file:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+    except ImportError:
+        return 0
+
+
+def directory_bytes(directory):
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, dirs, files in os.walk(directory) for name in files)
+
+
+def run_case(batch_export, make_scene, args, mode, file_format):
+    scene = make_scene(args)
+    settings = scene.batch_export
+    directory = tempfile.mkdtemp(prefix="batch_export_bench_")
+    settings.directory = directory
+    settings.file_format = file_format
+    settings.mode = mode
+    settings.object_types = {'MESH'}
+    if make_scene is make_shared:
+        settings.dedup = args.dedup
+
+    reset_peak_memory()
+    start = time.perf_counter()
+    result = bpy.ops.export_mesh.batch()
+    seconds = time.perf_counter() - start
+    items = batch_export.last_report.get("items", []) if 'FINISHED' in result else []
+    overhead = [record["total"] - record["export"] for record in items if "export" in record]
+    case = {
+        "finished": 'FINISHED' in result,
+        "items": len(items),
+        "files": batch_export.last_report.get("files", 0),
+        "seconds": seconds,
+        "overhead_per_item": sum(overhead) / len(overhead) if overhead else 0.0,
+        "plan_seconds": batch_export.last_report.get("timings", {}).get("plan", 0.0),
+        "peak_memory": peak_memory(),
+        "bytes": directory_bytes(directory),
+    }
+    shutil.rmtree(directory, ignore_errors=True)
+    return case
+
+
+# Prints each case's time against the baseline, returns the cases that got slower
+# than the threshold
+def compare(results, baseline, threshold):
+    slower = []
+    for key, case in results["cases"].items():
+        old = baseline["cases"].get(key)
+        if not old or not old["seconds"]:
+            print("%-40s %8.3f s (new)" % (key, case["seconds"]))
+            continue
+        ratio = case["seconds"] / old["seconds"]
+        print("%-40s %8.3f s  was %8.3f s  x%.2f%s" % (
+            key, case["seconds"], old["seconds"], ratio, "  SLOWER" if ratio > threshold else ""))
+        if ratio > threshold:
+            slower.append(key)
+    return slower
+
+
+def main():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(prog="blender --background --factory-startup --python benchmarks/export_loop.py --")
+    parser.add_argument("--objects", type=int, default=200)
+    parser.add_argument("--depth", type=int, default=10, help="Depth of the hierarchy scene's parent chains")
+    parser.add_argument("--scenes", default=",".join(scenes))
+    parser.add_argument("--modes", default=",".join(modes))
+    parser.add_argument("--formats", default="", help="Defaults to every available format")
+    parser.add_argument("--dedup", default='NONE', help="Shared Meshes option for the shared scene")
+    parser.add_argument("--output", default="", help="Where to save the results as a baseline")
+    parser.add_argument("--compare", default="", help="A baseline to compare the results with")
+    parser.add_argument("--threshold", type=float, default=1.1,
+                        help="How many times slower a case can get before it fails the comparison")
+    args = parser.parse_args(argv)
+
+    new_scene()
+    batch_export = importlib.import_module(module_name)
+    formats = args.formats.split(",") if args.formats else available_formats(batch_export)
+    results = {
+        "blender": bpy.app.version_string,
+        "objects": args.objects,
+        "cases": {},
+    }
+    for scene_name in args.scenes.split(","):
+        for mode in args.modes.split(","):
+            for file_format in formats:
+                key = "/".join((scene_name, mode, file_format))
+                case = run_case(batch_export, scenes[scene_name], args, mode, file_format)
+                results["cases"][key] = case
+                print("%-40s %8.3f s %4d items %7.2f ms plan %7.2f ms/item overhead %8.1f MB peak %10d bytes" % (
+                    key, case["seconds"], case["items"], case["plan_seconds"] * 1000,
+                    case["overhead_per_item"] * 1000,
+                    case["peak_memory"] / 1048576, case["bytes"]))
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=1)
+    if args.compare:
+        with open(args.compare) as file:
+            slower = compare(results, json.load(file), args.threshold)
+        if slower:
+            print(str(len(slower)) + " case(s) got slower")
+            sys.exit(1)
+
+
+main()
@@ -0,0 +1,55 @@
+# Compares the per-item cost of the two ways the batch export loop can select
+# each item's objects: deselecting everything with bpy.ops.object.select_all
+# (how it used to work), or only deselecting what the last item selected (select_only).
+# Run with Blender in the background:
+#
+#   blender --background --factory-startup --python benchmarks/selection.py -- [--objects 2000]
+import sys
+import time
+import argparse
+import bpy
+
+
+def make_scene(count):
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+    mesh = bpy.data.meshes.new("bench_mesh")
+    collection = bpy.context.scene.collection
+    objects = []
+    for i in range(count):
+        obj = bpy.data.objects.new("bench_" + str(i), mesh)
+        collection.objects.link(obj)
+        objects.append(obj)
+    return objects
+
+
+def with_select_all(objects):
+    for obj in objects:
+        bpy.ops.object.select_all(action='DESELECT')
+        obj.select_set(True)
+
+
+def with_select_only(objects):
+    selected = []
+    for obj in objects:
+        for s in selected:
+            s.select_set(False)
+        obj.select_set(True)
+        selected = [obj]
+
+
+def main():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--objects", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    objects = make_scene(args.objects)
+    for name, select in (("select_all", with_select_all), ("select_only", with_select_only)):
+        start = time.perf_counter()
+        select(objects)
+        seconds = time.perf_counter() - start
+        print("%-12s %8.3f s total %10.1f us per item" %
+              (name, seconds, seconds / len(objects) * 1e6))
+
+
+main()
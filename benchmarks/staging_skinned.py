@@ -0,0 +1,89 @@
+# Checks that both ways of setting the transform overrides export a posed, skinned rig
+# the same: a mesh deformed by an Armature modifier, parented to its rig, exported with
+# its modifiers applied after moving the rig. With Staging Copies, the copy of the mesh
+# has to be deformed by the copy of the rig (which was moved), not the original. Writes
+# OBJ files and compares their vertices. Run with Blender in the background:
+#
+#   blender --background --factory-startup --python benchmarks/staging_skinned.py
+import os
+import sys
+import math
+import shutil
+import tempfile
+import addon_utils
+import bpy
+
+addon_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+module_name = os.path.basename(addon_dir)
+if os.path.dirname(addon_dir) not in sys.path:
+    sys.path.append(os.path.dirname(addon_dir))
+
+
+def make_skinned_rig():
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+    addon_utils.enable(module_name, default_set=True, persistent=True)
+    scene = bpy.context.scene
+
+    # A rig with one bone, away from the origin so moving it changes the result
+    rig = bpy.data.objects.new("rig", bpy.data.armatures.new("rig"))
+    scene.collection.objects.link(rig)
+    rig.location = (5.0, 2.0, 0.0)
+    bpy.context.view_layer.objects.active = rig
+    bpy.ops.object.mode_set(mode='EDIT')
+    bone = rig.data.edit_bones.new("bone")
+    bone.head = (0.0, 0.0, 0.0)
+    bone.tail = (0.0, 0.0, 2.0)
+    bpy.ops.object.mode_set(mode='OBJECT')
+    rig.pose.bones["bone"].rotation_mode = 'XYZ'
+    rig.pose.bones["bone"].rotation_euler = (math.radians(40.0), 0.0, math.radians(25.0))
+
+    # A column of vertices along the bone, all weighted to it
+    bpy.ops.mesh.primitive_cylinder_add(vertices=16, depth=2.0, location=(0.0, 0.0, 1.0))
+    skin = bpy.context.active_object
+    skin.name = "skin"
+    skin.location = rig.location + skin.location
+    group = skin.vertex_groups.new(name="bone")
+    group.add([v.index for v in skin.data.vertices], 1.0, 'REPLACE')
+    modifier = skin.modifiers.new("Armature", 'ARMATURE')
+    modifier.object = rig
+    skin.parent = rig
+    skin.matrix_parent_inverse = rig.matrix_world.inverted()
+    return scene
+
+
+def obj_vertices(directory):
+    vertices = []
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".obj"):
+            with open(os.path.join(directory, name), 'r') as file:
+                vertices += [line for line in file if line.startswith("v ")]
+    return vertices
+
+
+def main():
+    results = {}
+    for transform_mode in ('IN_PLACE', 'STAGING'):
+        scene = make_skinned_rig()
+        settings = scene.batch_export
+        settings.directory = tempfile.mkdtemp(prefix="batch_export_check_")
+        settings.file_format = 'OBJ'
+        settings.mode = 'OBJECT_PARENTS'
+        settings.object_types = {'MESH', 'ARMATURE'}
+        settings.apply_mods = True
+        settings.set_location = True
+        settings.transform_mode = transform_mode
+        try:
+            bpy.ops.export_mesh.batch()
+            results[transform_mode] = obj_vertices(settings.directory)
+        finally:
+            shutil.rmtree(settings.directory, ignore_errors=True)
+
+    in_place, staging = results['IN_PLACE'], results['STAGING']
+    print("%d vertices exported in place, %d from staging copies" % (len(in_place), len(staging)))
+    if not in_place or in_place != staging:
+        print("DIFFERENT: the staging copies don't export the same as the objects")
+        sys.exit(1)
+    print("same")
+
+
+main()
@@ -0,0 +1,76 @@
+# Compares the two ways of setting the transform overrides on a rigged scene:
+# setting them on the objects themselves (IN_PLACE) or on staging copies (STAGING).
+# The scene is an armature with many meshes parented to it, each with a constraint
+# and a driver depending on it, so every change to the armature's transform makes
+# everything below it evaluate again. Run with Blender in the background:
+#
+#   blender --background --factory-startup --python benchmarks/transform_staging.py -- [--children 500]
+import os
+import sys
+import time
+import argparse
+import tempfile
+import importlib
+import addon_utils
+import bpy
+
+addon_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+module_name = os.path.basename(addon_dir)
+if os.path.dirname(addon_dir) not in sys.path:
+    sys.path.append(os.path.dirname(addon_dir))
+
+
+def make_rig(children):
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+    addon_utils.enable(module_name, default_set=True, persistent=True)
+    scene = bpy.context.scene
+    rig = bpy.data.objects.new("rig", bpy.data.armatures.new("rig"))
+    scene.collection.objects.link(rig)
+    target = bpy.data.objects.new("target", None)
+    scene.collection.objects.link(target)
+    bpy.ops.mesh.primitive_uv_sphere_add(segments=32, ring_count=16)
+    mesh = bpy.context.active_object.data
+    bpy.data.objects.remove(bpy.context.active_object)
+    for i in range(children):
+        obj = bpy.data.objects.new("part_" + str(i), mesh)
+        scene.collection.objects.link(obj)
+        obj.parent = rig
+        obj.location = (i % 20, i // 20, 0)
+        constraint = obj.constraints.new('DAMPED_TRACK')
+        constraint.target = target
+        driver = obj.driver_add("scale", 2).driver
+        var = driver.variables.new()
+        var.targets[0].id = rig
+        var.targets[0].data_path = "location.x"
+        driver.expression = "1 + var * 0.0"
+    return scene
+
+
+def main():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--children", type=int, default=500)
+    args = parser.parse_args(argv)
+
+    batch_export = importlib.import_module(module_name)
+    for transform_mode in ('IN_PLACE', 'STAGING'):
+        scene = make_rig(args.children)
+        settings = scene.batch_export
+        settings.directory = tempfile.mkdtemp(prefix="batch_export_bench_")
+        settings.file_format = 'OBJ'
+        settings.mode = 'OBJECT_PARENTS'
+        settings.object_types = {'MESH', 'ARMATURE'}
+        settings.set_location = True
+        settings.set_rotation = True
+        settings.transform_mode = transform_mode
+
+        start = time.perf_counter()
+        bpy.ops.export_mesh.batch()
+        seconds = time.perf_counter() - start
+        items = batch_export.last_report["items"]
+        transform = sum(r["transform_set"] + r["transform_reset"] for r in items)
+        print("%-9s %8.3f s total %8.3f s setting/resetting transforms" %
+              (transform_mode, seconds, transform))
+
+
+main()
@@ -0,0 +1,29 @@
+# Command line entry point for batch exporting without the UI, for example on
+# a build server or render farm. Run it with Blender in the background:
+#
+#   blender --background --python path/to/this/addon/cli.py -- [settings] [FILE.blend ...]
+#
+# Any batch export setting can be given as --<setting> <value>, for example:
+#
+#   blender -b --python cli.py -- --file_format FBX --mode COLLECTIONS --directory //export/ a.blend b.blend
+#
+# Run with --help after the -- to list every setting. Blender exits with 0 if
+# everything exported, or 1 if anything failed.
+import os
+import sys
+import importlib
+import addon_utils
+
+addon_dir = os.path.dirname(os.path.abspath(__file__))
+module_name = os.path.basename(addon_dir)
+
+# Allow running from a copy of the addon that isn't installed in Blender's addon folders
+if os.path.dirname(addon_dir) not in sys.path:
+    sys.path.append(os.path.dirname(addon_dir))
+
+# persistent keeps the addon enabled when the .blend files are opened
+if not addon_utils.check(module_name)[1] and not addon_utils.enable(module_name, default_set=True, persistent=True):
+    print("Couldn't enable the Super Batch Export addon: " + module_name)
+    sys.exit(1)
+
+sys.exit(importlib.import_module(module_name).cli_main())